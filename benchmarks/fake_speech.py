@@ -0,0 +1,63 @@
+"""
+A stand-in for the macOS speech stack, so that benchmarks can run anywhere.
+
+Speaking, rendering and playing take as long as the real thing would
+(according to the nominal speaking rate), multiplied by `time_scale`;
+use a `time_scale` of 0 to measure the program's own overhead.
+"""
+
+import time
+import wave
+
+import read_a_script.audio
+import read_a_script.voices
+from read_a_script.audio import CHANNELS, SAMPLE_RATE, SAMPLE_WIDTH
+from read_a_script.duration import nominal_duration
+
+VOICES = ["Alex", "Daniel", "Fred", "Moira", "Samantha", "Tom", "Ava", "Susan"]
+# rendering to a file is faster than real time
+RENDER_SPEED = 10
+
+
+class FakeSynthesizer:
+    """Behaves like macos_speech.Synthesizer, but only pretends to speak"""
+
+    def __init__(self, voice=None, rate=None, time_scale=1.0):
+        self.voice = voice
+        self.rate = rate
+        self.time_scale = time_scale
+        self.spoken = 0
+
+    def say(self, text):
+        """Take as long as saying `text` would"""
+        self.spoken += 1
+        time.sleep(nominal_duration(self.rate, text) * self.time_scale)
+
+
+def installed_voices():
+    """What `say -v ?` would print"""
+    return [f"{name:<20}en_GB    # Hello, my name is {name}." for name in VOICES]
+
+
+def install(time_scale=1.0):
+    """Replace the speech stack with fakes taking `time_scale` times as long as the real thing"""
+
+    def render(voice, rate, text, path):
+        seconds = nominal_duration(rate, text)
+        time.sleep(seconds * time_scale / RENDER_SPEED)
+        with wave.open(path, "wb") as w:
+            w.setnchannels(CHANNELS)
+            w.setsampwidth(SAMPLE_WIDTH)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(b"\0" * int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH * CHANNELS)
+
+    def play(path):
+        with wave.open(path, "rb") as w:
+            time.sleep(w.getnframes() / w.getframerate() * time_scale)
+
+    read_a_script.voices.list_installed_voices = installed_voices
+    read_a_script.voices.synthesizers.factory = lambda voice, rate: FakeSynthesizer(
+        voice, rate, time_scale
+    )
+    read_a_script.audio.render = render
+    read_a_script.audio.play = play
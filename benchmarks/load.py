@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  load.py [-h] [-n CLIENTS] [--scenes SCENES] [--time-scale SCALE]
+
+Options:
+  -h, --help                          Document how to use this program
+  -n CLIENTS, --clients CLIENTS       How many clients rehearse at once [default: 8]
+  --scenes SCENES                     How many scenes the synthetic script has [default: 20]
+  --time-scale SCALE                  How long rendering and playing take, compared with the real thing [default: 0.01]
+
+Load-test the rehearsal server: start one on a synthetic script, with a fake speech backend,
+and have CLIENTS simulated clients rehearse the whole script at once over localhost,
+each learning a different role, with each learning method in turn. Reports:
+
+  sessions      how many sessions finished, and how long the slowest took (seconds)
+  plays         how many clips the clients were told to play, and how many different ones
+  renders       how many clips were rendered, and how many of those more than once (which should be none)
+  response      how long after a client replied it was told what to do next (p50 and p95, milliseconds)
+
+Exits non-zero if any session failed, or if any clip was rendered more than once.
+"""
+
+import collections
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import docopt
+
+import fake_speech
+import read_a_script.audio
+from read_a_script.script_learner import LearningMethod, ScriptReciter
+from read_a_script.server import HOST, Connection, RehearsalServer
+from read_a_script.telemetry import percentile
+from run import config as benchmark_config
+from synthetic import CHARACTERS, synthetic_script
+
+
+def count_renders(renders):
+    """Count how many times each clip is rendered, by key, into `renders`"""
+    render = read_a_script.audio.render
+    lock = threading.Lock()
+
+    def counting_render(voice, rate, text, path):
+        with lock:
+            renders[os.path.basename(path).split(".")[0]] += 1
+        render(voice, rate, text, path)
+
+    read_a_script.audio.render = counting_render
+
+
+def client(port, role, method, time_scale, results):
+    """
+    Rehearse `role` with the learning `method`, as `join` would but pausing for `time_scale` times as long,
+    recording what happened in `results`
+    """
+    start = time.perf_counter()
+    plays = []
+    responses = []
+    with socket.create_connection((HOST, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = Connection(sock.makefile("rb"), sock.makefile("wb"))
+        connection.send({"roles": [role], "options": {"learning-method": method}})
+        replied = None
+        while True:
+            message = connection.receive()
+            if replied is not None and "output" not in message:
+                responses.append(time.perf_counter() - replied)
+                replied = None
+            if "play" in message:
+                plays.append(os.path.basename(message["play"]))
+                connection.send({"played": True})
+                replied = time.perf_counter()
+            elif "pause" in message:
+                time.sleep(message["pause"] * time_scale)
+                connection.send({"paused": True})
+                replied = time.perf_counter()
+            elif "key" in message:
+                # read the whole line
+                connection.send({"key": "y"})
+                replied = time.perf_counter()
+            elif "error" in message:
+                raise ValueError(message["error"])
+            elif "done" in message:
+                break
+    results.append((time.perf_counter() - start, plays, responses))
+
+
+def main():
+    """
+    Run the load test, and report on it
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    clients = int(opts["--clients"])
+    time_scale = float(opts["--time-scale"])
+    fake_speech.install(time_scale=time_scale)
+    renders = collections.Counter()
+    count_renders(renders)
+    methods = list(LearningMethod.__members__)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp, "xdg")
+        script_file = os.path.join(tmp, "synthetic.fountain")
+        with open(script_file, "w", encoding="utf-8") as f:
+            f.write(synthetic_script(int(opts["--scenes"])))
+        config = benchmark_config(os.path.join(tmp, "cache"))
+        config["options"]["audio-cache"] = True
+        reciter = ScriptReciter(script_file, [], config)
+        reciter.d  # pylint: disable=pointless-statement
+        reciter.index  # pylint: disable=pointless-statement
+
+        server = RehearsalServer(reciter, port=0)
+        serving = threading.Thread(target=server.serve_forever, daemon=True)
+        serving.start()
+        results = []
+        threads = [
+            threading.Thread(
+                target=client,
+                args=(
+                    server.port,
+                    CHARACTERS[i % len(CHARACTERS)],
+                    methods[i % len(methods)],
+                    time_scale,
+                    results,
+                ),
+            )
+            for i in range(clients)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+
+    plays = [p for _, played, _ in results for p in played]
+    responses = [r * 1000 for _, _, responded in results for r in responded]
+    repeated = sum(1 for n in renders.values() if n > 1)
+    print(
+        f"sessions  {len(results)} of {clients} finished in {elapsed:.2f}s"
+        f" (slowest {max((r[0] for r in results), default=0):.2f}s)"
+    )
+    print(f"plays     {len(plays)}, of {len(set(plays))} different clips")
+    print(f"renders   {sum(renders.values())}, {repeated} of them more than once")
+    if responses:
+        print(
+            f"response  p50 {percentile(responses, 50):.2f}ms, p95 {percentile(responses, 95):.2f}ms"
+        )
+    sys.exit(1 if len(results) < clients or repeated else 0)
+
+
+if __name__ == "__main__":
+    main()
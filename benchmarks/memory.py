@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  memory.py [-h] [-n SCENES] [SCRIPT_FILE]
+
+Options:
+  -h, --help                  Document how to use this program
+  -n SCENES, --scenes SCENES  How many scenes to put in the synthetic script [default: 1000]
+
+Compare the memory taken by Jouvence's parsed document with that taken by a CompactScript,
+for SCRIPT_FILE if it is given, otherwise for a synthetic script.
+"""
+
+import gc
+import sys
+import tracemalloc
+
+import docopt
+from jouvence.parser import JouvenceParser
+
+from read_a_script.compact import CompactScript
+from synthetic import synthetic_script
+
+
+def measure(build):
+    """Build something, returning it along with how many bytes it occupies"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+
+def main():
+    """
+    Measure both representations of the same script
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    if opts["SCRIPT_FILE"]:
+        with open(opts["SCRIPT_FILE"], encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_script(int(opts["--scenes"]))
+    d, document_size = measure(lambda: JouvenceParser().parseString(text))
+    _, compact_size = measure(lambda: CompactScript.from_document(d))
+    paragraphs = sum(len(s.paragraphs) for s in d.scenes)
+    print(f"{len(d.scenes)} scenes, {paragraphs} paragraphs")
+    print(f"Jouvence document: {document_size / 1e6:8.2f} MB")
+    print(f"CompactScript:     {compact_size / 1e6:8.2f} MB")
+    print(f"saving:            {100 * (1 - compact_size / document_size):8.0f}%")
+
+
+if __name__ == "__main__":
+    main()
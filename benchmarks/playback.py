@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  playback.py [-h] [-n CLIPS] [--clip-seconds SECONDS]
+
+Options:
+  -h, --help                          Document how to use this program
+  -n CLIPS, --clips CLIPS             How many clips to play, one after another [default: 20]
+  --clip-seconds SECONDS              How long each clip is [default: 0.25]
+
+Measure the gaps between clips played one after another, in real time:
+
+  process       starting a process for each clip, as `afplay` is (a Python process which sleeps
+                for as long as the clip lasts stands in for afplay, which isn't on every platform)
+  stream        playing through one StreamPlayer, into a NullSink which takes sound as fast as a sound card would
+
+For each, reports the time taken beyond the length of the clips (the total of the gaps, in seconds),
+the average gap between clips (milliseconds), and for the stream how often its sink ran dry.
+Exits non-zero if the stream's sink ran dry between clips.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import docopt
+
+from read_a_script.audio import CHANNELS, SAMPLE_RATE, SAMPLE_WIDTH
+from read_a_script.sound import NullSink, StreamPlayer
+
+# stands in for `afplay PATH`, playing for as long as the clip lasts
+STAND_IN = "import sys, time, wave; w = wave.open(sys.argv[1]); time.sleep(w.getnframes() / w.getframerate())"
+
+
+def make_clips(directory, count, seconds):
+    """Write `count` clips of `seconds` each into `directory`, returning their paths"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"clip{i}.wav")
+        with wave.open(path, "wb") as w:
+            w.setnchannels(CHANNELS)
+            w.setsampwidth(SAMPLE_WIDTH)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(b"\1\0" * CHANNELS * int(seconds * SAMPLE_RATE))
+        paths.append(path)
+    return paths
+
+
+def by_process(paths):
+    """Play each clip in a process of its own, returning how long it took"""
+    start = time.perf_counter()
+    for path in paths:
+        subprocess.run([sys.executable, "-c", STAND_IN, path], check=True)
+    return time.perf_counter() - start
+
+
+def by_stream(paths):
+    """Play every clip through one stream, returning how long it took and how often the sink ran dry"""
+    sink = NullSink()
+    player = StreamPlayer(sink)
+    start = time.perf_counter()
+    for path in paths:
+        player.play(path)
+    player.close()
+    return time.perf_counter() - start, sink.underruns
+
+
+def report(name, elapsed, heard, clips, extra=""):
+    """Print one line of results"""
+    gaps = max(elapsed - heard, 0)
+    print(
+        f"{name:<8}  {gaps:.3f}s of gaps, {1000 * gaps / max(clips - 1, 1):.1f}ms between clips{extra}"
+    )
+
+
+def main():
+    """
+    Run the benchmark, and report on it
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    clips = int(opts["--clips"])
+    seconds = float(opts["--clip-seconds"])
+    heard = clips * seconds
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_clips(tmp, clips, seconds)
+        report("process", by_process(paths), heard, clips)
+        elapsed, underruns = by_stream(paths)
+        report("stream", elapsed, heard, clips, f"; ran dry {underruns} time(s)")
+    sys.exit(1 if underruns else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  run.py [-h] [--sizes SIZES] [-o OUTPUT_FILE] [--compare BASELINE_FILE] [--threshold PERCENT]
+
+Options:
+  -h, --help                          Document how to use this program
+  --sizes SIZES                       Numbers of scenes in the synthetic scripts to benchmark [default: 10,100,1000,10000]
+  -o OUTPUT_FILE, --output OUTPUT_FILE
+                                      Where to record the results (default: benchmarks/results/VERSION.json)
+  --compare BASELINE_FILE             Compare the results with an earlier run, and exit non-zero if anything regressed
+  --threshold PERCENT                 How much slower (or bigger) counts as a regression [default: 20]
+
+Benchmark script-learner headlessly, with a fake speech backend, on synthetic scripts of various sizes:
+
+  parse         parsing the script from scratch (seconds)
+  legacy-parse  parsing a legacy {scene} script of the same size from scratch (seconds)
+  load          loading the parsed script from the parse cache (seconds)
+  list-scenes   --list-scenes, with a warm cache (seconds)
+  list-roles    --list-roles, with a warm cache (seconds)
+  tally         tallying lines, words and speech for --stats from the parsed script (seconds)
+  stats         working out --stats from the tally, with a warm cache (seconds)
+  find-quote    --from-quote finding a line half way through, with a typo in it, with a warm cache (seconds)
+  dispatch      time spent in learn_scene per paragraph, with speech taking no time (microseconds)
+  peak-memory   peak memory while parsing and indexing (MB)
+  startup       running `script-learner --list-scenes` in a new process, with a warm cache (seconds)
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import docopt
+
+import fake_speech
+from read_a_script.cache import index_script, parse_script, parse_text
+from read_a_script.script_learner import ScriptReciter
+from read_a_script.stats import ScriptTally
+from startup import run as run_entry_point
+from synthetic import CHARACTERS, synthetic_legacy_script, synthetic_script
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# the most scenes to learn when measuring dispatch overhead
+DISPATCH_SCENES = 200
+REPEATS = 5
+
+
+def version():
+    """The version of read-a-script being benchmarked"""
+    # pylint: disable=import-outside-toplevel
+    import tomllib
+
+    with open(os.path.join(HERE, "..", "pyproject.toml"), "rb") as f:
+        return tomllib.load(f)["tool"]["poetry"]["version"]
+
+
+def best_of(func, repeats=REPEATS):
+    """The shortest time taken to call func(), in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def config(cache_dir):
+    """A configuration which speaks everything, without an audio cache"""
+    voices = dict(
+        (character, fake_speech.VOICES[i % len(fake_speech.VOICES)])
+        for i, character in enumerate(CHARACTERS)
+    )
+    return {
+        "voices": dict(voices, _DEFAULT="Daniel", _ACTION="Moira"),
+        "options": {
+            "rate": 175,
+            "learning-method": "SPEAK_AND_DISPLAY",
+            "cache-dir": cache_dir,
+            "audio-cache": False,
+        },
+    }
+
+
+def benchmark(scenes, tmp):
+    """Run every benchmark on a synthetic script with `scenes` scenes"""
+    script_file = os.path.join(tmp, f"synthetic-{scenes}.fountain")
+    with open(script_file, "w", encoding="utf-8") as f:
+        f.write(synthetic_script(scenes))
+    cache_dir = os.path.join(tmp, f"cache-{scenes}")
+    results = {}
+
+    results["parse"] = best_of(lambda: parse_script(script_file), repeats=1)
+    legacy = synthetic_legacy_script(scenes)
+    results["legacy-parse"] = best_of(lambda: parse_text(legacy), repeats=1)
+
+    tracemalloc.start()
+    index_script(script_file, cache_dir)
+    results["peak-memory"] = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    results["load"] = best_of(lambda: parse_script(script_file, cache_dir))
+
+    def listing(method):
+        with contextlib.redirect_stdout(io.StringIO()):
+            getattr(ScriptReciter(script_file, [], config(cache_dir)), method)()
+
+    results["list-scenes"] = best_of(lambda: listing("list_scenes"))
+    results["list-roles"] = best_of(lambda: listing("list_roles"))
+
+    script = parse_script(script_file, cache_dir)
+    results["tally"] = best_of(lambda: ScriptTally.build(script), repeats=1)
+    results["stats"] = best_of(
+        lambda: ScriptReciter(script_file, [], config(cache_dir)).stats()
+    )
+
+    middle = script.scenes[len(script.scenes) // 2].paragraphs
+    quotation = max((p.text for p in middle if p.text), key=len).split()[:6]
+    quotation[-1] = quotation[-1][1] + quotation[-1][0] + quotation[-1][2:]
+    reciter = ScriptReciter(script_file, [], config(cache_dir))
+    reciter.words  # pylint: disable=pointless-statement
+    results["find-quote"] = best_of(lambda: reciter.find_quote(" ".join(quotation)))
+
+    reciter = ScriptReciter(script_file, ["KIRK"], config(cache_dir))
+    selected = list(range(1, min(scenes, DISPATCH_SCENES) + 1))
+    paragraphs = sum(reciter.index.scene(i).length for i in selected)
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = best_of(lambda: reciter.learn(selected), repeats=1)
+    results["dispatch"] = elapsed / max(paragraphs, 1) * 1e6
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(HERE)] + env.get("PYTHONPATH", "").split(os.pathsep)
+    )
+    config_file = os.path.join(tmp, "config.yml")
+    with open(config_file, "w", encoding="utf-8") as f:
+        json.dump(config(cache_dir), f)
+    args = ["--list-scenes", "-c", config_file, "-f", script_file]
+    run_entry_point(args, env)
+    results["startup"] = (
+        statistics.median(run_entry_point(args, env)[0] for _ in range(REPEATS)) / 1000
+    )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print how the results compare with the baseline, returning True if anything regressed"""
+    regressed = False
+    for size, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(size, {}).get(metric)
+            if not before:
+                continue
+            change = 100 * (value / before - 1)
+            flag = "REGRESSION" if change > threshold else ""
+            regressed = regressed or bool(flag)
+            print(
+                f"{size:>6} {metric:<12} {before:12.6g} -> {value:12.6g} {change:+7.1f}% {flag}"
+            )
+    return regressed
+
+
+def main():
+    """
+    Run the benchmarks, record the results, and compare them with an earlier run
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    fake_speech.install(time_scale=0)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["XDG_CACHE_HOME"] = os.path.join(tmp, "xdg")
+        for scenes in map(int, opts["--sizes"].split(",")):
+            results[str(scenes)] = benchmark(scenes, tmp)
+            print(
+                f"{scenes:>6} scenes: "
+                + ", ".join(f"{k} {v:.6g}" for k, v in results[str(scenes)].items()),
+                flush=True,
+            )
+
+    output = opts["--output"] or os.path.join(HERE, "results", f"{version()}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": version(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {output}")
+
+    if opts["--compare"]:
+        with open(opts["--compare"], encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, float(opts["--threshold"])):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  startup.py [-h] [-n RUNS]
+
+Options:
+  -h, --help                  Document how to use this program
+  -n RUNS, --runs RUNS        How many times to start each entry point [default: 10]
+
+Measure how long each `script-learner` entry point takes to start up and finish,
+and check which heavyweight modules it imported along the way;
+then do the same for the thin client, with a daemon running.
+Each entry point has a time budget (the median run must come in under it)
+and a list of modules it must not import; exits non-zero if any budget is blown.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import docopt
+
+SCRIPT = """\
+Title: Startup Benchmark
+
+INT. BRIDGE - DAY
+
+The bridge hums.
+
+KIRK
+Beam me up.
+
+SPOCK
+That is illogical, Captain.
+"""
+
+CONFIG = """\
+voices:
+  _DEFAULT: Daniel
+  KIRK: Alex
+options:
+  rate: 150
+"""
+
+SPEECH = ["macos_speech", "readchar"]
+YAML = ["ruamel.yaml"]
+PARSER = ["jouvence.parser"]
+LOGGING = ["loguru"]
+
+# entry point arguments: (budget in milliseconds, modules which must not be imported)
+BUDGETS = {
+    "--help": (100, SPEECH + YAML + PARSER + LOGGING),
+    "--list-scenes": (150, SPEECH + YAML + LOGGING),
+    "--list-roles": (150, SPEECH + YAML + LOGGING),
+}
+if sys.platform == "darwin":
+    BUDGETS["--list-voices"] = (500, ["readchar"] + YAML + PARSER + LOGGING)
+
+# the same for the thin client, which must import none of the program itself
+CLIENT_FORBIDDEN = (
+    ["docopt", "read_a_script.script_learner"] + SPEECH + YAML + PARSER + LOGGING
+)
+CLIENT_BUDGETS = dict((flag, (80, CLIENT_FORBIDDEN)) for flag in BUDGETS)
+
+PROBE = """
+import sys
+sys.argv = ["script-learner"] + sys.argv[1:]
+from read_a_script.{module} import main
+try:
+    main()
+except SystemExit:
+    pass
+sys.stderr.write("\\nMODULES " + " ".join(sys.modules) + "\\n")
+"""
+
+
+def run(args, env, module="script_learner"):
+    """Run an entry point once; return how long it took (in ms) and the modules it imported"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)] + args,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    modules = result.stderr.rsplit("MODULES ", 1)[-1].split()
+    return elapsed, set(modules)
+
+
+def check(budgets, script_file, config_file, runs, env, module="script_learner"):
+    """Time each entry point against its budget, returning whether any of them failed"""
+    failed = False
+    for flag, (budget, forbidden) in budgets.items():
+        args = [flag, "-c", config_file, "-f", script_file]
+        # the first run warms the caches
+        run(args, env, module)
+        timings = []
+        for _ in range(runs):
+            elapsed, modules = run(args, env, module)
+            timings.append(elapsed)
+        median = statistics.median(timings)
+        imported = [m for m in forbidden if m in modules]
+        ok = median <= budget and not imported
+        failed = failed or not ok
+        print(
+            f"{'ok  ' if ok else 'FAIL'} {module:<14} {flag:<14} median {median:7.1f}ms"
+            f" (budget {budget}ms)"
+            + (f"; imported {', '.join(imported)}" if imported else "")
+        )
+    return failed
+
+
+def main():
+    """
+    Time every entry point against its budget
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    runs = int(opts["--runs"])
+    with tempfile.TemporaryDirectory() as tmp:
+        script_file = os.path.join(tmp, "play.fountain")
+        config_file = os.path.join(tmp, "config.yml")
+        with open(script_file, "w", encoding="utf-8") as f:
+            f.write(SCRIPT)
+        with open(config_file, "w", encoding="utf-8") as f:
+            f.write(CONFIG)
+        env = dict(os.environ, XDG_CACHE_HOME=os.path.join(tmp, "cache"))
+        env["PYTHONPATH"] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+            + env.get("PYTHONPATH", "").split(os.pathsep)
+        )
+        failed = check(BUDGETS, script_file, config_file, runs, env)
+        subprocess.run(
+            [sys.executable, "-m", "read_a_script.script_learner", "daemon"],
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        try:
+            failed = (
+                check(CLIENT_BUDGETS, script_file, config_file, runs, env, "client")
+                or failed
+            )
+        finally:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "read_a_script.script_learner",
+                    "daemon",
+                    "--stop",
+                ],
+                env=env,
+                capture_output=True,
+                check=True,
+            )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
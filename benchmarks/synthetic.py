@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  synthetic.py [-h] [-n SCENES] [--seed SEED] [--legacy] [OUTPUT_FILE]
+
+Options:
+  -h, --help                  Document how to use this program
+  -n SCENES, --scenes SCENES  How many scenes to generate [default: 100]
+  --seed SEED                 Seed for the random choices, so that scripts are reproducible [default: 0]
+  --legacy                    Generate a script in the legacy {scene} format instead
+
+Generate a synthetic Fountain script, writing it to OUTPUT_FILE (or to stdout).
+"""
+
+import random
+import sys
+
+import docopt
+
+CHARACTERS = [
+    "KIRK",
+    "SPOCK",
+    "BONES",
+    "UHURA",
+    "SCOTTY",
+    "SULU",
+    "CHEKOV",
+    "CHAPEL",
+    "RAND",
+    "KYLE",
+    "MRS MCKNIGHT",
+    "FATHER GERALD",
+]
+WORDS = (
+    "the captain beam me up scotty it is illogical doctor not a bricklayer "
+    "engage warp speed now shields are down phasers on stun hailing frequencies open "
+    "fascinating he's dead jim where no man has gone before"
+).split()
+LOCATIONS = ["BRIDGE", "SICKBAY", "ENGINEERING", "TRANSPORTER ROOM", "PLANET SURFACE"]
+
+
+def _sentence(rng, lo=3, hi=18):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(lo, hi))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", "!", "?", "..."])
+
+
+def synthetic_script(scenes, seed=0, lines_per_scene=(10, 30)):
+    """
+    A Fountain script with `scenes` scenes, each with a header, some action,
+    and a random number of speeches (some with parentheticals) from a fixed cast.
+    """
+    rng = random.Random(seed)
+    parts = ["Title: Synthetic Script\nAuthor: benchmarks/synthetic.py\n\n"]
+    for i in range(1, scenes + 1):
+        interior = rng.choice(["INT.", "EXT."])
+        parts.append(f"\n{interior} {rng.choice(LOCATIONS)} {i} - DAY\n\n")
+        parts.append(_sentence(rng, 5, 25) + "\n\n")
+        for _ in range(rng.randint(*lines_per_scene)):
+            parts.append(rng.choice(CHARACTERS) + "\n")
+            if rng.random() < 0.15:
+                parts.append(f"({rng.choice(WORDS)})\n")
+            parts.append(
+                " ".join(_sentence(rng) for _ in range(rng.randint(1, 3))) + "\n\n"
+            )
+            if rng.random() < 0.1:
+                parts.append(_sentence(rng, 5, 25) + "\n\n")
+        if rng.random() < 0.2:
+            parts.append("> CUT TO:\n\n")
+    return "".join(parts)
+
+
+def synthetic_legacy_script(scenes, seed=0, lines_per_scene=(10, 30)):
+    """
+    A script in the legacy {scene} format with `scenes` scenes, each with a name, some stage directions,
+    and a random number of speeches (some with directions, some carried onto a second line) from a fixed cast.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for i in range(1, scenes + 1):
+        parts.append(f"{{scene}} {rng.choice(LOCATIONS).title()} {i}\n")
+        parts.append(f"STAGE DIRECTIONS: {_sentence(rng, 5, 25)}\n")
+        for _ in range(rng.randint(*lines_per_scene)):
+            line = _sentence(rng)
+            if rng.random() < 0.15:
+                line += f" ({rng.choice(WORDS)}) {_sentence(rng)}"
+            parts.append(f"{rng.choice(CHARACTERS)}: {line}\n")
+            if rng.random() < 0.2:
+                parts.append(_sentence(rng) + "\n")
+            if rng.random() < 0.1:
+                parts.append(f"STAGE DIRECTIONS: {_sentence(rng, 5, 25)}\n")
+        parts.append("\n")
+    return "".join(parts)
+
+
+def main():
+    """
+    Write a synthetic script
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    generate = synthetic_legacy_script if opts["--legacy"] else synthetic_script
+    text = generate(int(opts["--scenes"]), seed=int(opts["--seed"]))
+    if opts["OUTPUT_FILE"]:
+        with open(opts["OUTPUT_FILE"], "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Rendered speech, cached on disk so that lines which have been heard before don't need synthesizing again.
+"""
+
+import collections
+import contextlib
+import hashlib
+import os
+import re
+import subprocess
+import threading
+
+from read_a_script.telemetry import telemetry
+from read_a_script.utils import logger, replacing, write_atomically
+
+CLIP_SUFFIX = ".wav"
+
+# every clip is rendered in the same format, so that clips can be joined together
+SAMPLE_RATE = 22050
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+DATA_FORMAT = f"LEI{8 * SAMPLE_WIDTH}@{SAMPLE_RATE}"
+
+
+def normalize_text(text):
+    """Reduce a line to the form in which it is spoken (and cached)"""
+    # macos_speech barfs if lines end in a hyphen
+    return re.sub(r"\s+", " ", text.replace("-\n", "- ")).strip()
+
+
+def clip_key(voice, rate, text):
+    """The cache key for `text` spoken by `voice` at `rate`"""
+    return hashlib.sha256(
+        f"{voice}\0{rate or ''}\0{normalize_text(text)}".encode("utf-8")
+    ).hexdigest()
+
+
+def say_command(voice, rate, path=None):
+    """
+    The command which speaks the text on its standard input in `voice` at `rate`:
+    aloud, or into a WAV file at `path` if one is given
+    """
+    cmd = ["say", "-v", voice]
+    if rate:
+        cmd += ["-r", str(rate)]
+    if path is not None:
+        cmd += ["-o", path, "--file-format=WAVE", f"--data-format={DATA_FORMAT}"]
+    return cmd + ["-f", "-"]
+
+
+def play_command(path):
+    """The command which plays an audio file"""
+    return ["afplay", path]
+
+
+def render(voice, rate, text, path):
+    """Synthesize `text` into a WAV file at `path`"""
+    subprocess.run(
+        say_command(voice, rate, path), input=text.encode("utf-8"), check=True
+    )
+
+
+def play(path):
+    """Play an audio file, returning when it has finished"""
+    subprocess.run(play_command(path), check=True)
+
+
+@contextlib.contextmanager
+def scratch_cache(audio_cache):
+    """
+    Yield `audio_cache` - or, if there isn't one, an unlimited AudioCache in a temporary directory,
+    which is removed afterwards: speech has to be rendered somewhere, even if it isn't going to be kept
+    """
+    if audio_cache is not None:
+        yield audio_cache
+        return
+    # pylint: disable=import-outside-toplevel
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        yield AudioCache(directory, float("inf"))
+
+
+class AudioCache:
+    """
+    A directory of rendered clips, keyed by (voice, rate, normalized text).
+
+    When the clips take up more than `max_bytes`, the least recently played are evicted.
+    Recency survives between runs, as the modification time of each clip is updated when it's played.
+
+    The cache is safe to use from several threads at once;
+    if a clip is asked for while another thread is rendering it, it is rendered only once.
+    Clips which other processes have rendered into the directory since it was read are picked up as they're asked for.
+
+    If a DurationModel is given, the length of each newly rendered clip is recorded in it.
+    If a RehearsalPack, `packed`, is given, clips are copied out of it rather than rendered,
+    and asking for a clip which isn't in it raises PackError.
+    """
+
+    def __init__(self, directory, max_bytes, durations=None, packed=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.durations = durations
+        self.packed = packed
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._clips = collections.OrderedDict()
+        self._rendering = {}
+        # the clips which were rendered ahead of being played, and haven't been played yet
+        self._prefetched = set()
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(CLIP_SUFFIX):
+                st = os.stat(os.path.join(directory, name))
+                entries.append((st.st_mtime, name[: -len(CLIP_SUFFIX)], st.st_size))
+        for _, key, size in sorted(entries):
+            self._clips[key] = size
+            self._size += size
+
+    def path(self, key):
+        """The file in which the clip with `key` is kept"""
+        return os.path.join(self.directory, key + CLIP_SUFFIX)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._clips
+
+    def clip(self, voice, rate, text, count=True):
+        """
+        Return the path of the rendered clip of `text` spoken by `voice` at `rate`,
+        rendering it first if it isn't already cached.
+        Unless `count` is set, the clip is only being fetched ahead of being played, and isn't counted
+        as a hit or miss; a clip fetched ahead by rendering it counts as a miss when it's played.
+        """
+        key = clip_key(voice, rate, text)
+        path = self.path(key)
+        while True:
+            with self._lock:
+                if key in self._clips:
+                    if count:
+                        if key in self._prefetched:
+                            self._prefetched.discard(key)
+                            self.misses += 1
+                        else:
+                            self.hits += 1
+                    self._clips.move_to_end(key)
+                    try:
+                        os.utime(path)
+                        return path
+                    except FileNotFoundError:
+                        # somebody else tidied it up
+                        self._size -= self._clips.pop(key)
+                rendering = self._rendering.get(key)
+                if rendering is None:
+                    try:
+                        # it may have been rendered by another process sharing the directory
+                        self._clips[key] = os.path.getsize(path)
+                        self._size += self._clips[key]
+                        continue
+                    except FileNotFoundError:
+                        pass
+                    if count:
+                        self._prefetched.discard(key)
+                        self.misses += 1
+                    else:
+                        self._prefetched.add(key)
+                    rendering = self._rendering[key] = threading.Event()
+                    break
+            # another thread is rendering this clip: wait for it, then look again
+            rendering.wait()
+        try:
+            if self.packed is not None:
+                packed = self.packed.clip(key)
+                if packed is None:
+                    # pylint: disable=import-outside-toplevel
+                    from read_a_script.pack import PackError
+
+                    raise PackError(
+                        f"{self.packed.path} has no speech for {text!r} in {voice}: pack the script again"
+                    )
+                write_atomically(path, packed)
+            else:
+                # say goes by the suffix of the file it's told to write
+                with replacing(path, CLIP_SUFFIX) as tmp:
+                    with telemetry.span("render", voice=voice, chars=len(text)):
+                        render(voice, rate, normalize_text(text), tmp)
+            if self.durations is not None:
+                self.durations.observe_clip(voice, rate, text, path)
+            with self._lock:
+                self._clips[key] = os.path.getsize(path)
+                self._size += self._clips[key]
+                self._evict(keep=key)
+        finally:
+            with self._lock:
+                del self._rendering[key]
+            rendering.set()
+        return path
+
+    def play(self, voice, rate, text):
+        """Speak `text`, from the cache if possible"""
+        play(self.clip(voice, rate, text))
+
+    def add(self, key, data):
+        """Put a clip which was rendered elsewhere into the cache, unless it's already there"""
+        with self._lock:
+            if key in self._clips or key in self._rendering:
+                return
+        write_atomically(self.path(key), data)
+        with self._lock:
+            if key not in self._clips:
+                self._clips[key] = len(data)
+                self._size += len(data)
+                self._evict(keep=key)
+
+    def discard(self, keys):
+        """Remove the clips with the given keys, if they're cached"""
+        with self._lock:
+            for key in keys:
+                size = self._clips.pop(key, None)
+                if size is None:
+                    continue
+                self._size -= size
+                try:
+                    os.remove(self.path(key))
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self, keep=None):
+        while self._size > self.max_bytes and len(self._clips) > 1:
+            key, size = next(iter(self._clips.items()))
+            if key == keep:
+                break
+            del self._clips[key]
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """A one-line summary of how well the cache is doing"""
+        total = self.hits + self.misses
+        rate = f"{100 * self.hits / total:.0f}%" if total else "n/a"
+        return (
+            f"{self.hits} hits, {self.misses} misses ({rate} hit rate), "
+            f"{self.evictions} evictions; {len(self._clips)} clips, "
+            f"{self._size / 1e6:.1f} of {self.max_bytes / 1e6:.0f} MB"
+        )
+
+    def log_stats(self):
+        """Log the cache statistics"""
+        logger.info(f"Audio cache: {self.stats()}")
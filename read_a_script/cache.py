@@ -0,0 +1,230 @@
+"""
+On-disk caches, so that repeat launches don't have to redo work whose inputs haven't changed.
+"""
+
+import hashlib
+import marshal
+import os
+
+import jouvence
+
+from read_a_script.compact import COMPACT_FORMAT, CompactScript
+from read_a_script.index import INDEX_FORMAT, ScriptIndex
+from read_a_script.legacy import LEGACY_FORMAT, is_legacy, read_scenes
+from read_a_script.telemetry import telemetry
+from read_a_script.utils import logger, write_atomically
+
+# bump this whenever the layout of a cached document changes
+CACHE_FORMAT = 2
+
+PARSED_SUFFIX = ".parsed"
+INDEX_SUFFIX = ".index"
+TALLY_SUFFIX = ".tally"
+WORDS_SUFFIX = ".words"
+CONFIG_SUFFIX = ".config"
+
+
+def cache_dir(config=None):
+    """
+    Find the directory in which cached data is kept.
+
+    This is `options.cache-dir` from the config if it is set,
+    otherwise `read-a-script` under $XDG_CACHE_HOME (or ~/.cache).
+    """
+    options = (config or {}).get("options") or {}
+    if options.get("cache-dir"):
+        return os.path.expanduser(options["cache-dir"])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "read-a-script")
+
+
+def content_key(data: bytes, *salt) -> str:
+    """Hash some content, along with anything else that affects what we derive from it"""
+    h = hashlib.sha256()
+    for s in salt:
+        h.update(str(s).encode("utf-8"))
+        h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+def _path_key(path) -> str:
+    return hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+
+def _cached(directory, source, key, suffix, build, dump, load):
+    """
+    Return `load(entry)` for the cache entry matching `key`,
+    or `build()` if there isn't one - in which case, store `dump(result)` for next time,
+    replacing any earlier entry derived from the same `source`.
+    """
+    prefix = _path_key(source) + "-"
+    entry = os.path.join(directory, prefix + key + suffix)
+    try:
+        with open(entry, "rb") as f:
+            return load(f.read())
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable cache entry {entry}: {e}")
+
+    value = build()
+    _store(directory, source, key, suffix, dump(value))
+    return value
+
+
+def _store(directory, source, key, suffix, data: bytes):
+    """Store a cache entry, replacing any earlier entry derived from the same `source`"""
+    prefix = _path_key(source) + "-"
+    entry = os.path.join(directory, prefix + key + suffix)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith(suffix):
+                os.remove(os.path.join(directory, name))
+        write_atomically(entry, data)
+    except OSError as e:
+        logger.warning(f"Could not write cache entry {entry}: {e}")
+
+
+def parse_text(text):
+    """Parse the text of a script - in Fountain, or in the legacy format (see read_a_script.legacy) - into a CompactScript"""
+    with telemetry.span("parse", chars=len(text)):
+        if is_legacy(text):
+            return CompactScript.from_scenes(read_scenes(text.splitlines()))
+        # pylint: disable=import-outside-toplevel
+        from jouvence.parser import JouvenceParser
+
+        return CompactScript.from_document(JouvenceParser().parseString(text))
+
+
+def _script_key(data):
+    return content_key(
+        data, jouvence.__version__, CACHE_FORMAT, COMPACT_FORMAT, LEGACY_FORMAT
+    )
+
+
+def store_script(script_file, data, script, directory):
+    """
+    Put a CompactScript which was parsed from `data`, the contents of `script_file`, into the cache,
+    so that parse_script will find it
+    """
+    _store(directory, script_file, _script_key(data), PARSED_SUFFIX, script.dump())
+
+
+def parse_script(script_file, directory=None):
+    """
+    Parse a script into a CompactScript, using a cached copy if there is one.
+
+    Cache entries are keyed on a hash of the script's contents and the parser version,
+    so editing the script invalidates its entry; stale entries for the same script are removed.
+    If `directory` is None, the script is always parsed.
+    """
+    with open(script_file, "rb") as f:
+        data = f.read()
+    if directory is None:
+        return parse_text(data.decode("utf-8"))
+    return _cached(
+        directory,
+        script_file,
+        _script_key(data),
+        PARSED_SUFFIX,
+        lambda: parse_text(data.decode("utf-8")),
+        CompactScript.dump,
+        CompactScript.load,
+    )
+
+
+def _derived(script_file, directory, kind, fmt, suffix):
+    """
+    Get `kind.build(script)` of a parsed script - its ScriptIndex, say - using a cached copy if there is one.
+    `kind` dumps and loads what it builds, in the format `fmt`; cached copies end in `suffix`.
+
+    The copy is cached alongside the parsed script, and is invalidated in the same way;
+    if it has to be built, the parsed script is taken from the cache if it can be.
+    If `directory` is None, the script is always parsed.
+    """
+    if directory is None:
+        return kind.build(parse_script(script_file))
+    with open(script_file, "rb") as f:
+        data = f.read()
+    return _cached(
+        directory,
+        script_file,
+        content_key(
+            data,
+            jouvence.__version__,
+            CACHE_FORMAT,
+            COMPACT_FORMAT,
+            LEGACY_FORMAT,
+            fmt,
+        ),
+        suffix,
+        lambda: kind.build(parse_script(script_file, directory)),
+        kind.dump,
+        kind.load,
+    )
+
+
+def index_script(script_file, directory=None):
+    """Get the ScriptIndex of a script, using a cached copy if there is one"""
+    return _derived(script_file, directory, ScriptIndex, INDEX_FORMAT, INDEX_SUFFIX)
+
+
+def tally_script(script_file, directory=None):
+    """Get the ScriptTally of a script (see read_a_script.stats), using a cached copy if there is one"""
+    # pylint: disable=import-outside-toplevel
+    from read_a_script.stats import TALLY_FORMAT, ScriptTally
+
+    return _derived(script_file, directory, ScriptTally, TALLY_FORMAT, TALLY_SUFFIX)
+
+
+def index_words(script_file, directory=None):
+    """Get the WordIndex of a script (see read_a_script.search), using a cached copy if there is one"""
+    # pylint: disable=import-outside-toplevel
+    from read_a_script.search import WORDS_FORMAT, WordIndex
+
+    return _derived(script_file, directory, WordIndex, WORDS_FORMAT, WORDS_SUFFIX)
+
+
+def _plain(value):
+    """Convert ruamel.yaml's round-trip types into plain Python types"""
+    if isinstance(value, dict):
+        return {_plain(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    for t in (bool, int, float, str):
+        if isinstance(value, t):
+            return t(value)
+    return value
+
+
+def _parse_yaml(text):
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml import YAML
+
+    return _plain(YAML().load(text))
+
+
+def load_config(config_file=None, default=""):
+    """
+    Load the YAML configuration from `config_file`, or from the `default` text if there is no file.
+
+    The parsed config is compiled into the cache, so YAML is only parsed when the config changes.
+    """
+    if config_file is not None:
+        with open(config_file, "rb") as f:
+            data = f.read()
+        source = config_file
+    else:
+        data = default.encode("utf-8")
+        source = "<default>"
+    return _cached(
+        cache_dir(),
+        source,
+        content_key(data, CACHE_FORMAT),
+        CONFIG_SUFFIX,
+        lambda: _parse_yaml(data.decode("utf-8")),
+        marshal.dumps,
+        marshal.loads,
+    )
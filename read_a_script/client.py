@@ -0,0 +1,82 @@
+"""
+The `script-learner` command: hand the command line to a running daemon if there is one,
+otherwise run it in this process.
+
+This module is imported on every run, so it must stay small: nothing it imports may be slow to load.
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+
+SOCKET_FILE = "daemon.sock"
+
+
+def socket_path():
+    """
+    Where the daemon listens: in the default cache directory, which is worked out here
+    without loading any configuration (see read_a_script.cache.cache_dir)
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "read-a-script", SOCKET_FILE)
+
+
+def connect(path=None):
+    """A socket connected to the daemon, or None if it isn't running"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(argv, path=None):
+    """
+    Ask the daemon to run a command line, with this process's standard input, output and error,
+    returning its exit status - or None if there is no daemon to ask.
+    Ctrl-C is passed on to the process running the command.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    with sock:
+        message = json.dumps({"argv": argv, "cwd": os.getcwd()}) + "\n"
+        socket.send_fds(sock, [message.encode("utf-8")], [0, 1, 2])
+        replies = sock.makefile("r", encoding="utf-8")
+        pid = None
+
+        def interrupt(*_):
+            if pid is not None:
+                os.kill(pid, signal.SIGINT)
+
+        handler = signal.signal(signal.SIGINT, interrupt)
+        try:
+            for line in replies:
+                reply = json.loads(line)
+                if "pid" in reply:
+                    pid = reply["pid"]
+                elif "status" in reply:
+                    return reply["status"]
+        finally:
+            signal.signal(signal.SIGINT, handler)
+    # the daemon went away part way through
+    return 1
+
+
+def main():
+    """
+    Run script-learner, through the daemon if it's running
+    """
+    argv = sys.argv[1:]
+    if argv[:1] != ["daemon"]:
+        status = request(argv)
+        if status is not None:
+            sys.exit(status)
+    # pylint: disable=import-outside-toplevel
+    from read_a_script.script_learner import main as script_learner
+
+    script_learner()
@@ -0,0 +1,303 @@
+"""
+A compact, array-backed representation of a parsed script.
+
+Jouvence builds one Python object per paragraph; here, paragraph types and speaking characters are kept in typed arrays,
+and every piece of text in a single table of interned strings. Scenes and paragraphs are exposed through small views
+with the same fields as Jouvence's objects, so code written against a JouvenceDocument works on a CompactScript too.
+"""
+
+import array
+import marshal
+import sys
+
+from read_a_script.utils import ElementType
+
+# bump this whenever the layout of a dumped script changes
+COMPACT_FORMAT = 1
+
+# the string ID used for "no text"
+NONE = -1
+
+_SPEAKING_TYPES = frozenset(
+    t.value
+    for t in (
+        ElementType.CHARACTER,
+        ElementType.PARENTHETICAL,
+        ElementType.DIALOG,
+        ElementType.LYRICS,
+    )
+)
+
+
+class Paragraph:
+    """A view of one paragraph: its `type`, `text`, and the `character` speaking it (if anyone is)"""
+
+    __slots__ = ("type", "text", "character", "depth")
+
+    def __init__(self, p_type, text, character=None, depth=None):
+        self.type = p_type
+        self.text = text
+        self.character = character
+        self.depth = depth
+
+    def __repr__(self):
+        return f"Paragraph({ElementType(self.type).name}, {self.text!r})"
+
+
+class Paragraphs:
+    """A view of the paragraphs of one scene, as a sequence of Paragraph"""
+
+    __slots__ = ("_script", "_start", "_stop")
+
+    def __init__(self, script, start, stop):
+        self._script = script
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._script.paragraph(self._start + i)
+
+    def __iter__(self):
+        paragraph = self._script.paragraph
+        for i in range(self._start, self._stop):
+            yield paragraph(i)
+
+
+class Scene:
+    """A view of one scene: its `header` and its `paragraphs`"""
+
+    __slots__ = ("_script", "number")
+
+    def __init__(self, script, number):
+        self._script = script
+        self.number = number
+
+    @property
+    def header(self):
+        """The scene header"""
+        return self._script.string(self._script.headers[self.number])
+
+    @property
+    def offset(self):
+        """The position of this scene's first paragraph among all the script's paragraphs"""
+        return self._script.scene_offsets[self.number]
+
+    @property
+    def paragraphs(self):
+        """The scene's paragraphs"""
+        offsets = self._script.scene_offsets
+        return Paragraphs(self._script, offsets[self.number], offsets[self.number + 1])
+
+
+class CompactScript:
+    """
+    A parsed script, held as:
+
+    - `strings`, a table of interned strings, which everything else refers to by ID;
+    - `types`, the ElementType value of each paragraph;
+    - `texts`, the string ID of each paragraph's text;
+    - `characters`, the string ID of the character speaking each paragraph, or NONE;
+    - `headers`, the string ID of each scene's header;
+    - `scene_offsets`, the position of each scene's first paragraph, followed by the total number of paragraphs;
+    - `depths`, the depth of each section paragraph, by position;
+    - `title_values`, the title page.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        strings,
+        types,
+        texts,
+        characters,
+        headers,
+        scene_offsets,
+        depths=None,
+        title_values=None,
+    ):
+        self.strings = strings
+        self.types = types
+        self.texts = texts
+        self.characters = characters
+        self.headers = headers
+        self.scene_offsets = scene_offsets
+        self.depths = depths or {}
+        self.title_values = title_values or {}
+        self.scenes = [Scene(self, i) for i in range(len(headers))]
+
+    @classmethod
+    def from_scenes(cls, scenes, title_values=None):
+        """Build a CompactScript from scenes with Jouvence's fields (`header`, and `paragraphs` with `type` and `text`)"""
+        builder = _Builder()
+        for scene in scenes:
+            builder.add_scene(scene)
+        return builder.build(cls, title_values)
+
+    @classmethod
+    def from_document(cls, d):
+        """Build a CompactScript from a JouvenceDocument"""
+        return cls.from_scenes(d.scenes, d.title_values)
+
+    def replace_scenes(self, scenes, title_values=None):
+        """
+        Build a new CompactScript from `scenes`, each of which is either the number (counting from 0)
+        of one of this script's scenes, which is copied across without looking at its paragraphs,
+        or a scene with Jouvence's fields, which is added.
+        The new script's string table starts as a copy of this one's, so copied scenes keep their string IDs.
+        """
+        builder = _Builder(self.strings)
+        for scene in scenes:
+            if isinstance(scene, int):
+                builder.copy_scene(self, scene)
+            else:
+                builder.add_scene(scene)
+        return builder.build(
+            type(self), self.title_values if title_values is None else title_values
+        )
+
+    def string(self, string_id):
+        """Look up a string by its ID"""
+        return None if string_id == NONE else self.strings[string_id]
+
+    def paragraph(self, i):
+        """A view of the paragraph at position `i` in the whole script"""
+        strings = self.strings
+        text = self.texts[i]
+        character = self.characters[i]
+        return Paragraph(
+            self.types[i],
+            None if text == NONE else strings[text],
+            None if character == NONE else strings[character],
+            self.depths.get(i),
+        )
+
+    def __len__(self):
+        return len(self.types)
+
+    def dump(self) -> bytes:
+        """Serialise the script into a compact form"""
+        return marshal.dumps(
+            (
+                COMPACT_FORMAT,
+                self.strings,
+                self.types.tobytes(),
+                self.texts.tobytes(),
+                self.characters.tobytes(),
+                self.headers.tobytes(),
+                self.scene_offsets.tobytes(),
+                self.depths,
+                self.title_values,
+            )
+        )
+
+    @classmethod
+    def load(cls, data: bytes):
+        """Rebuild a script from the output of `dump`"""
+        (
+            compact_format,
+            strings,
+            types,
+            texts,
+            characters,
+            headers,
+            scene_offsets,
+            depths,
+            title_values,
+        ) = marshal.loads(data)
+        if compact_format != COMPACT_FORMAT:
+            raise ValueError(f"unsupported compact script format {compact_format}")
+
+        def _array(typecode, data):
+            a = array.array(typecode)
+            a.frombytes(data)
+            return a
+
+        return cls(
+            [sys.intern(s) for s in strings],
+            _array("b", types),
+            _array("i", texts),
+            _array("i", characters),
+            _array("i", headers),
+            _array("I", scene_offsets),
+            depths,
+            title_values,
+        )
+
+
+class _Builder:
+    """Accumulates the arrays of a CompactScript, one scene at a time"""
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.ids = dict((s, i) for i, s in enumerate(self.strings))
+        self.types = array.array("b")
+        self.texts = array.array("i")
+        self.characters = array.array("i")
+        self.headers = array.array("i")
+        self.scene_offsets = array.array("I")
+        self.depths = {}
+
+    def intern(self, s):
+        """The ID of a string, adding it to the table if it isn't there already"""
+        if s is None:
+            return NONE
+        try:
+            return self.ids[s]
+        except KeyError:
+            self.ids[s] = len(self.strings)
+            self.strings.append(sys.intern(s))
+            return self.ids[s]
+
+    def add_scene(self, scene):
+        """Add a scene with Jouvence's fields"""
+        intern = self.intern
+        types = self.types
+        self.headers.append(intern(scene.header))
+        self.scene_offsets.append(len(types))
+        character = NONE
+        for p in scene.paragraphs:
+            if p.type == ElementType.CHARACTER.value:
+                character = intern(p.text.strip())
+            elif p.type not in _SPEAKING_TYPES:
+                character = NONE
+            if p.type == ElementType.SECTION.value:
+                self.depths[len(types)] = p.depth
+            types.append(p.type)
+            self.texts.append(intern(p.text))
+            self.characters.append(character)
+
+    def copy_scene(self, script, number):
+        """Copy a scene from a script whose string table this one's starts with"""
+        start, stop = script.scene_offsets[number], script.scene_offsets[number + 1]
+        shift = len(self.types) - start
+        self.headers.append(script.headers[number])
+        self.scene_offsets.append(len(self.types))
+        self.types.extend(script.types[start:stop])
+        self.texts.extend(script.texts[start:stop])
+        self.characters.extend(script.characters[start:stop])
+        for i, depth in script.depths.items():
+            if start <= i < stop:
+                self.depths[i + shift] = depth
+
+    def build(self, cls, title_values=None):
+        """The finished script"""
+        self.scene_offsets.append(len(self.types))
+        return cls(
+            self.strings,
+            self.types,
+            self.texts,
+            self.characters,
+            self.headers,
+            self.scene_offsets,
+            self.depths,
+            dict(title_values or {}),
+        )
@@ -0,0 +1,308 @@
+"""
+A long-running daemon which keeps parsed scripts, the installed voices, synthesizers and audio caches in memory,
+so that the commands handed to it by `script-learner` (see read_a_script.client) start straight away.
+
+Each command runs in a process forked from the daemon and attached to the client's terminal:
+it starts with everything the daemon has loaded, and whatever it does can't disturb the daemon.
+"""
+
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+
+import docopt
+
+from read_a_script import script_learner
+from read_a_script.client import connect, socket_path
+from read_a_script.utils import logger
+from read_a_script.voices import synthesizers
+
+LOG_FILE = "daemon.log"
+# how often to check whether commands have finished, in case a signal that one has is missed (seconds)
+POLL_INTERVAL = 1
+# the longest request the daemon will read
+MAX_REQUEST = 1 << 16
+
+
+class DaemonError(RuntimeError):
+    """The daemon could not be started or stopped"""
+
+
+def _exit_status(status):
+    """The exit status to report for a wait() status, in the way a shell would"""
+    code = os.waitstatus_to_exitcode(status)
+    return 128 - code if code < 0 else code
+
+
+def _exit(status):
+    """Leave a forked process, without going back into the code it was forked from"""
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        # pylint: disable=protected-access
+        os._exit(status)
+
+
+def _run(argv, shared):
+    """Run a command line, returning its exit status"""
+    try:
+        script_learner.main(argv, shared=shared)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 128 + signal.SIGINT
+    return 0
+
+
+class Daemon:
+    """
+    Listens on a Unix socket at `path` for command lines to run.
+
+    Before forking a process to run a command, the daemon loads what it will need into a ScriptReciter,
+    which it keeps for each script and configuration until the script changes:
+    the parsed script and its index, the installed voices, and the audio cache
+    (or, if there's no audio cache, a synthesizer for each voice).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+        self.reciters = {}
+        self.selector = selectors.DefaultSelector()
+        self.server = None
+        # the connection to the client of each running command, by process id
+        self.running = {}
+        self.stopping = False
+
+    def serve(self, ready=None):
+        """Handle requests until asked to stop, calling `ready()` once the socket is listening"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            self.server.bind(self.path)
+        finally:
+            os.umask(umask)
+        self.server.listen()
+        self.selector.register(self.server, selectors.EVENT_READ)
+        # wake up as soon as a command finishes
+        wakeup, wakeup_signal = socket.socketpair()
+        wakeup.setblocking(False)
+        wakeup_signal.setblocking(False)
+        self.selector.register(wakeup, selectors.EVENT_READ)
+        signal.set_wakeup_fd(wakeup_signal.fileno())
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        logger.info(f"Listening on {self.path}")
+        if ready is not None:
+            ready()
+        try:
+            while not self.stopping:
+                for key, _ in self.selector.select(POLL_INTERVAL):
+                    if key.fileobj is self.server:
+                        self._accept()
+                    elif key.fileobj is wakeup:
+                        wakeup.recv(MAX_REQUEST)
+                    else:
+                        self._hang_up(key.fileobj, key.data)
+                self._reap()
+        finally:
+            for pid in self.running:
+                os.kill(pid, signal.SIGINT)
+            while self.running:
+                self._reap(block=True)
+            signal.set_wakeup_fd(-1)
+            self.selector.close()
+            self.server.close()
+            wakeup.close()
+            wakeup_signal.close()
+            os.remove(self.path)
+            logger.info("Stopped")
+
+    def stop(self):
+        """Stop handling requests"""
+        self.stopping = True
+
+    def _accept(self):
+        conn, _ = self.server.accept()
+        fds = []
+        try:
+            conn.settimeout(1)
+            message, fds, _, _ = socket.recv_fds(conn, MAX_REQUEST, 3)
+            while message and not message.endswith(b"\n"):
+                message += conn.recv(MAX_REQUEST)
+            request = json.loads(message)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable request: {e}")
+            conn.close()
+            for fd in fds:
+                os.close(fd)
+            return
+        if request.get("stop"):
+            self.stop()
+            conn.sendall(b'{"status": 0}\n')
+            conn.close()
+            return
+        try:
+            pid = self._fork(request["argv"], request["cwd"], fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        conn.sendall(json.dumps({"pid": pid}).encode("utf-8") + b"\n")
+        self.running[pid] = conn
+        self.selector.register(conn, selectors.EVENT_READ, pid)
+
+    def _hang_up(self, conn, pid):
+        """The client has gone away (the client never sends anything else), so interrupt its command"""
+        self.selector.unregister(conn)
+        if pid in self.running:
+            logger.debug(f"Client of {pid} went away")
+            os.kill(pid, signal.SIGINT)
+
+    def _reap(self, block=False):
+        for pid, conn in list(self.running.items()):
+            done, status = os.waitpid(pid, 0 if block else os.WNOHANG)
+            if not done:
+                continue
+            del self.running[pid]
+            try:
+                self.selector.unregister(conn)
+            except KeyError:
+                pass
+            try:
+                conn.sendall(
+                    json.dumps({"status": _exit_status(status)}).encode("utf-8") + b"\n"
+                )
+            except OSError:
+                pass
+            conn.close()
+
+    def _fork(self, argv, cwd, fds):
+        """Run a command line in a new process, with `fds` as its standard input, output and error"""
+        shared = self.prepare(argv, cwd)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            return pid
+        status = 1
+        try:
+            self.selector.close()
+            self.server.close()
+            for conn in self.running.values():
+                conn.close()
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            for i, fd in enumerate(fds):
+                os.dup2(fd, i)
+            sys.stdout.reconfigure(line_buffering=True)
+            sys.stderr.reconfigure(line_buffering=True)
+            os.chdir(cwd)
+            sys.argv = ["script-learner"] + list(argv)
+            status = _run(argv, shared)
+        finally:
+            _exit(status)
+
+    def prepare(self, argv, cwd):
+        """
+        The ScriptReciter with everything loaded that the command line will need, or None if it can't be made
+        (in which case the command will report why)
+        """
+        try:
+            opts = docopt.docopt(script_learner.__doc__, argv, help=False)
+        except SystemExit:
+            return None
+        previous = os.getcwd()
+        try:
+            os.chdir(cwd)
+            learner = script_learner.learner_for(opts)
+            script_file = os.path.abspath(learner.script_file)
+            key = (script_file, repr(learner.config))
+            st = os.stat(script_file)
+            signature = (st.st_mtime_ns, st.st_size)
+            kept = self.reciters.get(key)
+            if kept is not None and kept[0] == signature:
+                return kept[1]
+            learner.script_file = script_file
+            learner.index  # pylint: disable=pointless-statement
+            learner.d  # pylint: disable=pointless-statement
+            if opts["--from-quote"]:
+                learner.words  # pylint: disable=pointless-statement
+            learner.voice_catalog.voices  # pylint: disable=pointless-statement
+            if learner.audio_cache is None:
+                learner.cast()
+                for actor in set(learner.actors.values()):
+                    synthesizers.get(actor.voice.name, actor.rate)
+            self.reciters[key] = (signature, learner)
+            logger.info(f"Loaded {script_file}")
+            return learner
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug(f"Could not prepare for {argv}: {e}")
+            return None
+        finally:
+            os.chdir(previous)
+
+
+def start(foreground=False, path=None):
+    """
+    Start the daemon in the background (or in this process, if `foreground` is set),
+    logging to LOG_FILE beside its socket
+    """
+    path = path or socket_path()
+    running = connect(path)
+    if running is not None:
+        running.close()
+        raise DaemonError(f"The daemon is already running, listening on {path}")
+    if foreground:
+        Daemon(path).serve()
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    log_file = os.path.join(os.path.dirname(path), LOG_FILE)
+    ready, signal_ready = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(signal_ready)
+        os.waitpid(pid, 0)
+        with os.fdopen(ready, "rb") as f:
+            if not f.read(1):
+                raise DaemonError(f"The daemon could not be started: see {log_file}")
+        print(f"The daemon is listening on {path}")
+        return
+    # detach from the terminal, in a grandchild which can't pick up another one
+    os.close(ready)
+    os.setsid()
+    if os.fork():
+        _exit(0)
+    status = 1
+    try:
+        os.chdir("/")
+        with open(os.devnull, "rb") as devnull:
+            os.dup2(devnull.fileno(), 0)
+        with open(log_file, "ab") as log:
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+        Daemon(path).serve(ready=lambda: os.write(signal_ready, b"+"))
+        status = 0
+    finally:
+        _exit(status)
+
+
+def stop(path=None):
+    """Ask the daemon to stop, interrupting any commands it's running"""
+    sock = connect(path)
+    if sock is None:
+        raise DaemonError("The daemon is not running")
+    with sock:
+        sock.sendall(b'{"stop": true}\n')
+        sock.recv(MAX_REQUEST)
+    print("The daemon is stopping")
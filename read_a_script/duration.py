@@ -0,0 +1,119 @@
+"""
+Predict how long a line takes to speak, without speaking it.
+
+The prediction starts from the nominal speaking rate (`say -r` is in words per minute),
+and is calibrated for each voice by comparing the prediction with the length of lines that are really rendered.
+"""
+
+import json
+import os
+import re
+import threading
+import wave
+
+from read_a_script.utils import logger, write_atomically
+
+# what `say` uses if it isn't told a rate
+DEFAULT_RATE = 175
+# a pause at the end of a sentence or clause takes about as long as this many words
+SENTENCE_PAUSE = 0.6
+CLAUSE_PAUSE = 0.25
+
+WORD_RE = re.compile(r"[\w']+")
+SENTENCE_RE = re.compile(r"[.!?]+(\s|$)")
+CLAUSE_RE = re.compile(r"[,;:—]|--")
+
+
+def nominal_words(text):
+    """How many words `text` takes as long to say as, counting its pauses"""
+    return (
+        len(WORD_RE.findall(text))
+        + SENTENCE_PAUSE * len(SENTENCE_RE.findall(text))
+        + CLAUSE_PAUSE * len(CLAUSE_RE.findall(text))
+    )
+
+
+def nominal_duration(rate, text):
+    """How long `text` would take to say at `rate` words per minute, before any calibration"""
+    return nominal_words(text) * 60.0 / (rate or DEFAULT_RATE)
+
+
+def clip_duration(path):
+    """The length in seconds of a WAV file"""
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+class DurationModel:
+    """
+    Estimates speaking time for each voice, as the nominal duration scaled by a per-voice factor.
+
+    The factor is the ratio of the real to nominal durations of every line observed in that voice;
+    voices with no observations use the factor across all voices.
+    The observations are kept in a JSON file at `path`, if one is given.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._voices = {}
+        self._dirty = False
+        if path is not None:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._voices = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable duration model {path}: {e}")
+
+    def factor(self, voice):
+        """How much longer than nominal `voice` takes to speak"""
+        with self._lock:
+            observed = self._voices.get(voice)
+            if observed is None:
+                observed = {
+                    "actual": sum(v["actual"] for v in self._voices.values()),
+                    "nominal": sum(v["nominal"] for v in self._voices.values()),
+                }
+        if observed["nominal"] <= 0:
+            return 1.0
+        return observed["actual"] / observed["nominal"]
+
+    def estimate(self, voice, rate, text):
+        """Predict how many seconds `voice` takes to say `text` at `rate`"""
+        return nominal_duration(rate, text) * self.factor(voice)
+
+    def observe(self, voice, rate, text, seconds):
+        """Record that `voice` took `seconds` to say `text` at `rate`"""
+        nominal = nominal_duration(rate, text)
+        if nominal <= 0:
+            return
+        with self._lock:
+            observed = self._voices.setdefault(
+                voice, {"actual": 0.0, "nominal": 0.0, "samples": 0}
+            )
+            observed["actual"] += seconds
+            observed["nominal"] += nominal
+            observed["samples"] += 1
+            self._dirty = True
+
+    def observe_clip(self, voice, rate, text, path):
+        """Record the length of a rendered clip"""
+        try:
+            self.observe(voice, rate, text, clip_duration(path))
+        except (OSError, EOFError, wave.Error) as e:
+            logger.debug(f"Could not measure {path}: {e}")
+
+    def save(self):
+        """Write the observations back to disk, if there are any new ones"""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            data = json.dumps(self._voices)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_atomically(self.path, data)
+        except OSError as e:
+            logger.warning(f"Could not write duration model {self.path}: {e}")
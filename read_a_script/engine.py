@@ -0,0 +1,218 @@
+"""
+Play lines on an event loop which is also listening to the keyboard, so that a keypress can cut a line short.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import termios
+import threading
+
+from read_a_script import audio
+from read_a_script.player import Player, Skipped
+
+REWIND_KEYS = ("b",)
+QUIT_KEY = "\x04"
+
+
+class PlaybackEngine(Player):
+    """
+    A Player whose clips, speech and pauses run on an asyncio event loop in a thread of its own,
+    which reads the keyboard at the same time.
+
+    Actors still read their lines on the calling thread, but a keypress stops whatever they're playing
+    within a few milliseconds:
+
+    - B goes back to the line before;
+    - Ctrl-D stops reading, as if it had been pressed while waiting for input;
+    - a line which is waiting for keys (as in WAIT_FOR_INPUT) is given the key, once its playback has stopped;
+    - and any other key skips the rest of the line, moving on to the next one.
+
+    The loop is started when it's first needed, and stopped by close(). While it's running,
+    the terminal doesn't echo, and delivers keys as they're pressed.
+
+    If a StreamPlayer, `stream`, is given, clips and pauses are played through it rather than by `afplay`.
+    """
+
+    def __init__(self, synths=None, keyboard=True, stream=None):
+        super().__init__(synths)
+        self.keyboard = keyboard
+        self.stream = stream
+        self.loop = None
+        self._thread = None
+        self._terminal = None
+        self._keys = None
+        self._current = None
+        self._process = None
+        self._skipped = False
+        self._rewind = False
+        self._quit = False
+        self._wants_keys = False
+
+    def _call(self, coro):
+        """Run a coroutine on the loop, waiting for its result"""
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self.loop.run_forever, name="playback", daemon=True
+            )
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _start(self):
+        self._keys = asyncio.Queue()
+        if self.keyboard and sys.stdin.isatty():
+            fd = sys.stdin.fileno()
+            self._terminal = termios.tcgetattr(fd)
+            mode = termios.tcgetattr(fd)
+            mode[3] &= ~(termios.ICANON | termios.ECHO)
+            termios.tcsetattr(fd, termios.TCSADRAIN, mode)
+            self.loop.add_reader(fd, self._read_keys, fd)
+            print("  While a line is being read, hit any key to skip the rest of it,")
+            print("  or B to go back to the line before")
+
+    def _read_keys(self, fd):
+        for key in os.read(fd, 32).decode("utf-8", "replace"):
+            if key.lower() in REWIND_KEYS:
+                self._rewind = True
+                self._skip()
+            elif self._wants_keys:
+                if self._current is not None:
+                    self._current.set()
+                self._keys.put_nowait(key)
+            elif key == QUIT_KEY:
+                self._quit = True
+                self._skip()
+            else:
+                self._skip()
+
+    def _skip(self):
+        self._skipped = True
+        if self._current is not None:
+            self._current.set()
+        # wake up anything waiting for a key
+        self._keys.put_nowait(None)
+
+    async def _run(self, cmd, data=None):
+        """Run a command until it finishes, or until it's interrupted"""
+        if self._skipped:
+            return
+        interrupted = self._current = asyncio.Event()
+        process = self._process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=(
+                asyncio.subprocess.DEVNULL if data is None else asyncio.subprocess.PIPE
+            ),
+        )
+        finished = asyncio.ensure_future(process.communicate(data))
+        stopped = asyncio.ensure_future(interrupted.wait())
+        try:
+            await asyncio.wait([finished, stopped], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+            if not finished.done():
+                process.kill()
+            await finished
+            self._current = self._process = None
+        if process.returncode and not interrupted.is_set():
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+    async def _stream(self, method, *args):
+        """Play something through the stream until it has been queued, or until it's interrupted"""
+        if self._skipped:
+            return
+        interrupted = self._current = asyncio.Event()
+        finished = self.loop.run_in_executor(None, method, *args)
+        stopped = asyncio.ensure_future(interrupted.wait())
+        try:
+            await asyncio.wait([finished, stopped], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+            if not finished.done():
+                self.stream.stop()
+            await finished
+            self._current = None
+
+    async def _pause(self, seconds):
+        if self._skipped:
+            return
+        interrupted = self._current = asyncio.Event()
+        try:
+            await asyncio.wait_for(interrupted.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._current = None
+
+    async def _key(self):
+        self._wants_keys = True
+        key = None if self._skipped else await self._keys.get()
+        if key is None:
+            raise Skipped
+        return key
+
+    async def _begin(self):
+        self._skipped = self._rewind = self._quit = self._wants_keys = False
+        while not self._keys.empty():
+            self._keys.get_nowait()
+
+    async def _end(self):
+        return self._rewind, self._quit
+
+    async def _stop(self):
+        self._skip()
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=1)
+        if self._terminal is not None:
+            fd = sys.stdin.fileno()
+            self.loop.remove_reader(fd)
+            termios.tcsetattr(fd, termios.TCSADRAIN, self._terminal)
+            self._terminal = None
+
+    def play(self, path):
+        if self.stream is not None:
+            self._call(self._stream(self.stream.play, path))
+        else:
+            self._call(self._run(audio.play_command(path)))
+
+    def speak(self, voice, rate, text):
+        self._call(self._run(audio.say_command(voice, rate), text.encode("utf-8")))
+
+    def pause(self, seconds):
+        if self.stream is not None:
+            self._call(self._stream(self.stream.pause, seconds))
+        else:
+            self._call(self._pause(seconds))
+
+    def key(self):
+        return self._call(self._key())
+
+    def read(self, actor, line, position):
+        self._call(self._begin())
+        try:
+            actor.read_line(line)
+        except Skipped:
+            print()
+        rewind, quit_ = self._call(self._end())
+        if quit_:
+            raise EOFError
+        return max(position - 1, 0) if rewind else position + 1
+
+    def close(self):
+        if self.stream is not None:
+            # let the end of the last clip be heard
+            self.stream.close()
+        if self.loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result()
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+            self.loop = self._thread = None
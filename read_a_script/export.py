@@ -0,0 +1,157 @@
+"""
+Export scenes as audio files, one per scene, for rehearsing away from the computer.
+
+The learner's own lines are replaced by silence lasting as long as the line would take to say.
+Scenes are rendered in parallel on a pool of processes, and each exported file is only re-rendered
+when something that goes into it has changed.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import wave
+
+from read_a_script.audio import (
+    CHANNELS,
+    SAMPLE_RATE,
+    SAMPLE_WIDTH,
+    AudioCache,
+    scratch_cache,
+)
+from read_a_script.utils import logger, replacing, write_atomically
+
+MANIFEST_FILE = "export.json"
+# the pause left between one line and the next
+LINE_GAP = 0.4
+
+
+def scene_plan(reciter, scene):
+    """
+    Work out what goes into the audio for a scene, as a list of segments which are either
+    ("speech", voice, rate, text) or ("silence", seconds, voice, rate, text) for the learner's lines.
+    """
+    plan = []
+    for _, actor, line in reciter.scene_lines(scene):
+        if actor.role in reciter.roles:
+            if line:
+                seconds = reciter.durations.estimate(actor.voice.name, actor.rate, line)
+                plan.append(("silence", seconds, actor.voice.name, actor.rate, line))
+        else:
+            speech = actor.speech(line)
+            if speech:
+                plan.append(("speech", actor.voice.name, actor.rate, speech))
+    return plan
+
+
+def plan_key(plan):
+    """
+    A hash of everything that goes into a scene's audio.
+    Silences are keyed on the line they stand in for rather than their estimated length,
+    so that recalibrating the duration model doesn't invalidate every exported scene.
+    """
+    h = hashlib.sha256()
+    h.update(f"{SAMPLE_RATE}/{SAMPLE_WIDTH}/{CHANNELS}/{LINE_GAP}".encode("utf-8"))
+    for segment in plan:
+        if segment[0] == "silence":
+            segment = ("silence",) + segment[2:]
+        h.update(json.dumps(segment).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _silence(seconds):
+    return b"\0" * (int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH * CHANNELS)
+
+
+def render_scene(plan, path, cache_dir, cache_size, pack_file=None):
+    """
+    Render a scene's plan into a WAV file at `path`, taking speech from the audio cache in `cache_dir`,
+    or from the rehearsal pack `pack_file`, if one is given
+    """
+    packed = None
+    if pack_file is not None:
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.pack import RehearsalPack
+
+        packed = RehearsalPack(pack_file)
+    audio_cache = AudioCache(cache_dir, cache_size, packed=packed)
+    with replacing(path) as tmp, wave.open(tmp, "wb") as out:
+        out.setnchannels(CHANNELS)
+        out.setsampwidth(SAMPLE_WIDTH)
+        out.setframerate(SAMPLE_RATE)
+        for segment in plan:
+            if segment[0] == "silence":
+                out.writeframes(_silence(segment[1]))
+            else:
+                _, voice, rate, text = segment
+                with wave.open(audio_cache.clip(voice, rate, text), "rb") as clip:
+                    out.writeframes(clip.readframes(clip.getnframes()))
+            out.writeframes(_silence(LINE_GAP))
+    return path
+
+
+def export(reciter, scenes, output_dir, jobs=None):
+    """
+    Export each of the given scene numbers (or all of them) to a WAV file in `output_dir`,
+    using up to `jobs` processes (by default, one per CPU).
+    Scenes whose content hasn't changed since they were last exported are left alone.
+    Returns the paths of the exported files, leaving out any scenes which could not be exported.
+    """
+    if scenes is None:
+        scenes = range(1, len(reciter.index) + 1)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    reciter.cast()
+    pack_file = None if reciter.pack is None else reciter.pack.path
+    paths = []
+    work = {}
+    for number in dict.fromkeys(scenes):
+        plan = scene_plan(reciter, reciter.d.scenes[number - 1])
+        name = f"scene-{number:03d}.wav"
+        path = os.path.join(output_dir, name)
+        paths.append(path)
+        key = plan_key(plan)
+        if manifest.get(name) == key and os.path.exists(path):
+            logger.info(f"{name} is up to date")
+            continue
+        work[name] = (key, plan, path)
+
+    failed = set()
+    try:
+        with scratch_cache(
+            reciter.audio_cache
+        ) as audio_cache, concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs
+        ) as pool:
+            futures = {}
+            for name, (key, plan, path) in work.items():
+                future = pool.submit(
+                    render_scene,
+                    plan,
+                    path,
+                    audio_cache.directory,
+                    audio_cache.max_bytes,
+                    pack_file,
+                )
+                futures[future] = (name, key, path)
+            for future in concurrent.futures.as_completed(futures):
+                name, key, path = futures[future]
+                try:
+                    future.result()
+                # pylint: disable=broad-except
+                except Exception as e:
+                    logger.error(f"Could not export {name}: {e}")
+                    manifest.pop(name, None)
+                    failed.add(path)
+                    continue
+                manifest[name] = key
+                logger.info(f"Exported {name}")
+    finally:
+        write_atomically(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+    return [path for path in paths if path not in failed]
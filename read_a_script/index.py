@@ -0,0 +1,165 @@
+"""
+An index of a parsed script, which answers questions about its scenes and roles without walking the paragraphs.
+"""
+
+import marshal
+
+from read_a_script.utils import SPOKEN_TYPES, ElementType
+
+# bump this whenever the layout of a saved index changes
+INDEX_FORMAT = 2
+
+
+class SceneIndex:
+    """
+    What's in one scene:
+
+    - its header;
+    - `offset`, the position of its first paragraph among all the script's paragraphs,
+      and `length`, how many paragraphs it has;
+    - `characters`, the characters who speak in it, in order of appearance;
+    - `lines` and `words`, how many lines and words each character speaks in it;
+    - `speeches`, the positions (within the scene) of the paragraphs each character speaks.
+    """
+
+    __slots__ = (
+        "header",
+        "offset",
+        "length",
+        "characters",
+        "lines",
+        "words",
+        "speeches",
+    )
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, header, offset, length, characters, lines, words, speeches):
+        self.header = header
+        self.offset = offset
+        self.length = length
+        self.characters = characters
+        self.lines = lines
+        self.words = words
+        self.speeches = speeches
+
+    def __repr__(self):
+        return (
+            f"SceneIndex({self.header!r}, offset={self.offset}, length={self.length})"
+        )
+
+    @classmethod
+    def build(cls, scene, offset):
+        """Index a scene, whose first paragraph is at `offset` in the script"""
+        lines = {}
+        words = {}
+        speeches = {}
+        character = None
+        for i, p in enumerate(scene.paragraphs):
+            if p.type == ElementType.CHARACTER.value:
+                character = p.text.strip()
+                lines.setdefault(character, 0)
+                words.setdefault(character, 0)
+                speeches.setdefault(character, [])
+            elif p.type in SPOKEN_TYPES and character is not None:
+                lines[character] += 1
+                words[character] += len((p.text or "").split())
+                speeches[character].append(i)
+        return cls(
+            scene.header,
+            offset,
+            len(scene.paragraphs),
+            tuple(lines),
+            lines,
+            words,
+            dict((c, tuple(s)) for c, s in speeches.items()),
+        )
+
+    def moved(self, offset):
+        """A copy of this index, for the same scene at a different offset"""
+        return SceneIndex(
+            self.header,
+            offset,
+            self.length,
+            self.characters,
+            self.lines,
+            self.words,
+            self.speeches,
+        )
+
+
+class ScriptIndex:
+    """
+    The scenes of a script, and who speaks in them.
+    """
+
+    def __init__(self, scenes):
+        self.scenes = scenes
+
+    @classmethod
+    def build(cls, d):
+        """Index a parsed document"""
+        scenes = []
+        offset = 0
+        for scene in d.scenes:
+            scenes.append(SceneIndex.build(scene, offset))
+            offset += len(scene.paragraphs)
+        return cls(scenes)
+
+    def update(self, d, origins):
+        """
+        Index a new version of the document, in which scene `i` is a copy of this index's scene `origins[i]`
+        (counting from 0), or is new if that is None; only the new scenes are looked at.
+        """
+        scenes = []
+        offset = 0
+        for scene, origin in zip(d.scenes, origins):
+            if origin is None:
+                scenes.append(SceneIndex.build(scene, offset))
+            else:
+                scenes.append(self.scenes[origin].moved(offset))
+            offset += scenes[-1].length
+        return ScriptIndex(scenes)
+
+    def __len__(self):
+        return len(self.scenes)
+
+    @property
+    def roles(self):
+        """Every character who speaks in the script, in alphabetical order"""
+        return sorted(set(c for scene in self.scenes for c in scene.characters))
+
+    def scene(self, number):
+        """Look up a scene by its (1-based) number"""
+        if not 1 <= number <= len(self.scenes):
+            raise IndexError(
+                f"There is no scene {number}: the script has {len(self.scenes)} scenes"
+            )
+        return self.scenes[number - 1]
+
+    def dump(self) -> bytes:
+        """Serialise the index into a compact form"""
+        return marshal.dumps(
+            (
+                INDEX_FORMAT,
+                [
+                    (
+                        s.header,
+                        s.offset,
+                        s.length,
+                        s.characters,
+                        s.lines,
+                        s.words,
+                        s.speeches,
+                    )
+                    for s in self.scenes
+                ],
+            )
+        )
+
+    @classmethod
+    def load(cls, data: bytes):
+        """Rebuild an index from the output of `dump`"""
+        index_format, scenes = marshal.loads(data)
+        if index_format != INDEX_FORMAT:
+            raise ValueError(f"unsupported index format {index_format}")
+        return cls([SceneIndex(*s) for s in scenes])
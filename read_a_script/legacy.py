@@ -0,0 +1,179 @@
+"""
+Scripts in the plain-text format which the original read-a-script.py read, such as:
+
+    {scene} The garden
+    TOM: Lovely day for it. (He sits down) Isn't it?
+    JENNY: Is it?
+    I suppose it is.
+    STAGE DIRECTIONS: It starts to rain.
+
+A line starting {scene} starts a new scene, named by the rest of the line. Any other line is `ROLE: line`,
+in which anything in brackets is a stage direction, or carries on from the line before.
+STAGE DIRECTIONS are read as action; blank lines are ignored.
+
+Legacy scripts are read a line at a time, in a single pass, into the same scenes and paragraphs
+as Jouvence makes of a Fountain script; they can be converted into Fountain, too.
+"""
+
+import os
+import re
+
+from jouvence.document import JouvenceScene, JouvenceSceneElement
+
+from read_a_script.utils import ElementType, logger, replacing
+
+SCENE_MARKER = "{scene}"
+# bump this whenever legacy scripts are read differently
+LEGACY_FORMAT = 1
+# the role whose lines are action
+STAGE_DIRECTIONS = "STAGE DIRECTIONS"
+FOUNTAIN_SUFFIX = ".fountain"
+
+# as in read-a-script.py
+DIALOGUE_RE = re.compile(r"^([A-Z\s_,\'ac&]+):\s*(.*)")
+DIRECTION_RE = re.compile(r"(\([^(]*\))")
+_MARKER_RE = re.compile(r"^[ \t]*\{scene\}", re.M)
+_SPACE_RE = re.compile(r"\s+")
+
+ACTION = ElementType.ACTION.value
+CHARACTER = ElementType.CHARACTER.value
+DIALOG = ElementType.DIALOG.value
+PARENTHETICAL = ElementType.PARENTHETICAL.value
+
+
+def is_legacy(text):
+    """Whether the text of a script is in the legacy format: that is, whether it has any {scene} markers"""
+    return _MARKER_RE.search(text) is not None
+
+
+def is_legacy_file(path):
+    """Whether a script file is in the legacy format, reading only as far as its first {scene} marker"""
+    with open(path, encoding="utf-8") as f:
+        return any(line.lstrip().startswith(SCENE_MARKER) for line in f)
+
+
+def read_scenes(lines):
+    """
+    Read the lines of a legacy script, yielding each scene (as a JouvenceScene) as soon as it's complete.
+
+    Each speech becomes a CHARACTER paragraph, followed by its DIALOG and PARENTHETICAL paragraphs,
+    with lines which carry on a speech added to its last DIALOG paragraph, as Jouvence would;
+    anything before the first {scene} marker is in a scene with no header.
+    """
+    scene = None
+    number = 0
+    # whose lines carry on from the line before, and whose speech has a CHARACTER paragraph already
+    speaker = STAGE_DIRECTIONS
+    speaking = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(SCENE_MARKER):
+            if scene is not None:
+                yield scene
+            number += 1
+            scene = JouvenceScene()
+            scene.header = line[len(SCENE_MARKER) :].strip() or f"Scene {number}"
+            speaking = None
+            continue
+        if scene is None:
+            scene = JouvenceScene()
+        paragraphs = scene.paragraphs
+        m = DIALOGUE_RE.match(line)
+        if m:
+            role, line = m.groups()
+            speaker = _SPACE_RE.sub(" ", role.strip()).upper()
+        for part in DIRECTION_RE.split(line):
+            part = part.strip()
+            if not part:
+                continue
+            if speaker == STAGE_DIRECTIONS:
+                paragraphs.append(JouvenceSceneElement(ACTION, part))
+                speaking = None
+                continue
+            if speaking != speaker:
+                paragraphs.append(JouvenceSceneElement(CHARACTER, speaker))
+                speaking = speaker
+            if part.startswith("("):
+                paragraphs.append(JouvenceSceneElement(PARENTHETICAL, part))
+            elif paragraphs[-1].type == DIALOG:
+                paragraphs[-1].text += "\n" + part
+            else:
+                paragraphs.append(JouvenceSceneElement(DIALOG, part))
+    if scene is not None:
+        yield scene
+
+
+def fountain(scenes, title=None):
+    """
+    Write scenes with Jouvence's fields out as Fountain, yielding it a piece at a time,
+    with a title page if there's a `title`
+    """
+    # pylint: disable=import-outside-toplevel
+    from jouvence.parser import RE_CHARACTER_LINE
+
+    if title:
+        yield f"Title: {title}\n"
+    for scene in scenes:
+        if scene.header is not None:
+            # a forced scene heading, as legacy scene names needn't look like one
+            yield f"\n.{scene.header}\n"
+        for p in scene.paragraphs:
+            if p.type == CHARACTER:
+                name = p.text if RE_CHARACTER_LINE.match(p.text) else "@" + p.text
+                yield f"\n{name}\n"
+            elif p.type in (DIALOG, PARENTHETICAL):
+                yield p.text + "\n"
+            else:
+                yield f"\n{p.text}\n"
+
+
+def convert_file(legacy_file, fountain_file):
+    """Convert a legacy script into a Fountain script, a scene at a time, returning the Fountain script's path"""
+    title = os.path.splitext(os.path.basename(legacy_file))[0]
+    with replacing(fountain_file) as tmp:
+        with open(legacy_file, encoding="utf-8") as f, open(
+            tmp, "w", encoding="utf-8"
+        ) as out:
+            out.writelines(fountain(read_scenes(f), title))
+    return fountain_file
+
+
+def convert(legacy_dir, fountain_dir, jobs=None):
+    """
+    Convert every legacy script in `legacy_dir` into a Fountain script of the same name in `fountain_dir`,
+    using up to `jobs` processes (by default, one per CPU); files which aren't legacy scripts are left alone.
+    Returns the paths of the Fountain scripts.
+    """
+    # pylint: disable=import-outside-toplevel
+    import concurrent.futures
+
+    os.makedirs(fountain_dir, exist_ok=True)
+    work = {}
+    for name in sorted(os.listdir(legacy_dir)):
+        path = os.path.join(legacy_dir, name)
+        try:
+            if not os.path.isfile(path) or not is_legacy_file(path):
+                logger.debug(f"{path} is not a legacy script")
+                continue
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read {path}: {e}")
+            continue
+        work[path] = os.path.join(
+            fountain_dir, os.path.splitext(name)[0] + FOUNTAIN_SUFFIX
+        )
+
+    paths = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = dict(
+            (pool.submit(convert_file, path, target), path)
+            for path, target in work.items()
+        )
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                paths.append(future.result())
+            # pylint: disable=broad-except
+            except Exception as e:
+                logger.error(f"Could not convert {futures[future]}: {e}")
+    return sorted(paths)
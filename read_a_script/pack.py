@@ -0,0 +1,460 @@
+"""
+Rehearsal packs: everything needed to rehearse a script, in one file which can be taken to another machine.
+
+A pack holds the script (as written, parsed, and indexed), the voice each role is read in,
+the voices that were installed when it was made, and the rendered speech of every line.
+It is memory-mapped when it's opened, so rehearsing from it starts straight away:
+nothing has to be parsed, and nothing has to be synthesized.
+
+The layout is MAGIC, then the sections and clips one after another, then a table of contents
+saying where each of them is, then a trailer: the offset and length of the table of contents,
+as little-endian unsigned 64-bit integers, and MAGIC again.
+
+The table of contents is a UTF-8 JSON object with:
+
+- `format`, PACK_FORMAT;
+- `name`, the name of the script file the pack was made from;
+- `voices` and `options`, the voice of each role and the PACKED_OPTIONS;
+- `voice-lines`, the lines describing the voices which were installed;
+- `sections` and `clips`, the `[offset, length]` of each section, and of the WAV file of each clip by its key.
+
+The sections are:
+
+- `source`, the script as it was written;
+- `script`, a UTF-8 JSON object with the `strings`, `depths` (as `[position, depth]` pairs)
+  and `title-values` of the parsed script (see CompactScript);
+- `types`, `texts`, `characters`, `headers` and `scene-offsets`, the arrays of the parsed script,
+  as little-endian signed 8-bit, signed 32-bit, signed 32-bit, signed 32-bit and unsigned 32-bit integers;
+- `index`, a UTF-8 JSON list of the scenes of the ScriptIndex, each as
+  `[header, offset, length, characters, lines, words, speeches]`.
+"""
+
+import array
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+
+from read_a_script.audio import clip_key, scratch_cache
+from read_a_script.compact import NONE, CompactScript
+from read_a_script.index import SceneIndex, ScriptIndex
+from read_a_script.player import Player
+from read_a_script.utils import (
+    ElementType,
+    hint_chunks,
+    replacing,
+    trimmed_cue,
+    write_atomically,
+)
+from read_a_script.voices import VoiceCatalog
+
+PACK_SUFFIX = ".rehearsal"
+MAGIC = b"RASPACK\n"
+# bump this whenever the layout of a pack changes
+PACK_FORMAT = 2
+# where the table of contents starts and how long it is, then MAGIC again
+_TRAILER = struct.Struct("<QQ8s")
+# the arrays of a CompactScript: the section each is in, its attribute, and its type code
+_ARRAYS = (
+    ("types", "types", "b"),
+    ("texts", "texts", "i"),
+    ("characters", "characters", "i"),
+    ("headers", "headers", "i"),
+    ("scene-offsets", "scene_offsets", "I"),
+)
+# the options which the speech in a pack was rendered with, and which rehearsing from it uses too
+PACKED_OPTIONS = ("rate", "speak-action", "cue-last-sentence", "hint-granularity")
+CONFIG_FILE = "config.yml"
+_ELEMENT_TYPES = frozenset(t.value for t in ElementType)
+
+
+class PackError(ValueError):
+    """A rehearsal pack can't be read, or can't be unpacked"""
+
+
+def is_pack(path):
+    """Whether a script file is a rehearsal pack, rather than a Fountain script"""
+    return str(path).lower().endswith(PACK_SUFFIX)
+
+
+class _PackedVoices(VoiceCatalog):
+    """The voices which were installed when a pack was made, rather than those installed now"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, lines):
+        self.lines = lines
+
+
+def _check_script(strings, depths, types, texts, characters, headers, scene_offsets):
+    """Raise ValueError unless the fields of a CompactScript are consistent with each other"""
+    # pylint: disable=too-many-arguments
+    if not len(types) == len(texts) == len(characters):
+        raise ValueError("its arrays of paragraphs are of different lengths")
+    if (
+        len(scene_offsets) != len(headers) + 1
+        or scene_offsets[0] != 0
+        or scene_offsets[-1] != len(types)
+        or any(a > b for a, b in zip(scene_offsets, scene_offsets[1:]))
+    ):
+        raise ValueError("its scenes don't cover its paragraphs")
+    for ids in (texts, characters, headers):
+        if ids and not NONE <= min(ids) <= max(ids) < len(strings):
+            raise ValueError("it refers to strings which it doesn't have")
+    if not _ELEMENT_TYPES.issuperset(types):
+        raise ValueError("it has paragraphs of unknown types")
+    if any(not 0 <= i < len(types) for i in depths):
+        raise ValueError("it has sections which aren't among its paragraphs")
+
+
+def _scene_index(header, offset, length, characters, lines, words, speeches):
+    """A SceneIndex from its fields, as they are kept in a pack"""
+    # pylint: disable=too-many-arguments
+    return SceneIndex(
+        header,
+        int(offset),
+        int(length),
+        tuple(characters),
+        dict(lines),
+        dict(words),
+        dict((c, tuple(s)) for c, s in speeches.items()),
+    )
+
+
+class RehearsalPack:
+    """
+    The rehearsal pack at `path`, memory-mapped.
+    The parsed script, its index and the catalog of voices are loaded from the mapping when they're first needed;
+    clips are handed out as views of it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise PackError(f"Could not open the rehearsal pack {path}: {e}") from e
+        self._view = memoryview(self._map)
+        if (
+            len(self._map) < len(MAGIC) + _TRAILER.size
+            or self._map[: len(MAGIC)] != MAGIC
+        ):
+            raise PackError(f"{path} is not a rehearsal pack")
+        start, length, magic = _TRAILER.unpack_from(
+            self._map, len(self._map) - _TRAILER.size
+        )
+        end = len(self._map) - _TRAILER.size
+        if magic != MAGIC or not len(MAGIC) <= start <= start + length <= end:
+            raise PackError(f"{path} is not complete")
+        try:
+            self.contents = json.loads(str(self._view[start : start + length], "utf-8"))
+        except ValueError:
+            # packs made before PACK_FORMAT 2 have a table of contents which isn't JSON
+            self.contents = None
+        if (
+            not isinstance(self.contents, dict)
+            or self.contents.get("format") != PACK_FORMAT
+        ):
+            raise PackError(
+                f"{path} was made by a different version of read-a-script: "
+                "pack the script again with this one"
+            )
+        try:
+            self._clips = dict(
+                (key, self._place(place, start))
+                for key, place in self.contents["clips"].items()
+            )
+            self._sections = dict(
+                (name, self._place(place, start))
+                for name, place in self.contents["sections"].items()
+            )
+            name = self.contents["name"]
+            if name in ("", ".", "..") or os.path.basename(name) != name:
+                raise ValueError(f"{name!r} is not the name of a script file")
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise PackError(f"{path} is damaged: {e}") from e
+
+    @staticmethod
+    def _place(place, end):
+        """The (start, length) of a section or clip, which must lie between MAGIC and `end`"""
+        start, length = place
+        if not (
+            isinstance(start, int)
+            and isinstance(length, int)
+            and len(MAGIC) <= start <= start + length <= end
+        ):
+            raise ValueError(f"{place} is out of bounds")
+        return start, length
+
+    def _section(self, name):
+        try:
+            start, length = self._sections[name]
+        except KeyError:
+            raise PackError(f"{self.path} has no {name} section") from None
+        return self._view[start : start + length]
+
+    def _json(self, name):
+        try:
+            return json.loads(str(self._section(name), "utf-8"))
+        except ValueError as e:
+            raise PackError(f"{self.path} has a damaged {name} section: {e}") from e
+
+    def _array(self, name, typecode):
+        """The array in section `name`, of little-endian integers of type `typecode`"""
+        a = array.array(typecode)
+        if a.itemsize != struct.calcsize(f"<{typecode}"):
+            raise PackError("Rehearsal packs can't be read on this platform")
+        try:
+            a.frombytes(self._section(name))
+        except ValueError as e:
+            raise PackError(f"{self.path} has a damaged {name} section: {e}") from e
+        if sys.byteorder == "big":
+            a.byteswap()
+        return a
+
+    @property
+    def name(self):
+        """The name of the script file the pack was made from"""
+        return self.contents["name"]
+
+    @property
+    def source(self):
+        """The text of the script, as it was written"""
+        return bytes(self._section("source"))
+
+    @property
+    def script(self):
+        """The parsed script"""
+        fields = self._json("script")
+        arrays = dict(
+            (attribute, self._array(name, typecode))
+            for name, attribute, typecode in _ARRAYS
+        )
+        try:
+            strings = [sys.intern(s) for s in fields["strings"]]
+            depths = dict((int(i), int(depth)) for i, depth in fields["depths"])
+            title_values = dict(fields["title-values"])
+            _check_script(strings, depths, **arrays)
+        except (KeyError, TypeError, ValueError) as e:
+            raise PackError(f"{self.path} has a damaged script: {e}") from e
+        return CompactScript(
+            strings, depths=depths, title_values=title_values, **arrays
+        )
+
+    @property
+    def index(self):
+        """The ScriptIndex of the script"""
+        scenes = self._json("index")
+        try:
+            return ScriptIndex([_scene_index(*scene) for scene in scenes])
+        except (AttributeError, TypeError, ValueError) as e:
+            raise PackError(f"{self.path} has a damaged index: {e}") from e
+
+    @property
+    def voice_catalog(self):
+        """The voices which were installed when the pack was made"""
+        return _PackedVoices(self.contents["voice-lines"])
+
+    def configure(self, config):
+        """`config`, with the voices and PACKED_OPTIONS which the pack's speech was rendered with"""
+        options = dict(config.get("options") or {})
+        options.update(self.contents["options"])
+        return dict(config, voices=dict(self.contents["voices"]), options=options)
+
+    def clip(self, key):
+        """The WAV file of the clip with `key`, as a view of the pack, or None if it isn't in the pack"""
+        place = self._clips.get(key)
+        if place is None:
+            return None
+        start, length = place
+        return self._view[start : start + length]
+
+    def __contains__(self, key):
+        return key in self._clips
+
+    def __len__(self):
+        return len(self._clips)
+
+
+def _speech(reciter, granularity):
+    """
+    (voice, rate, text) for everything which reading the whole script could speak, once each,
+    whoever is learning it: every role's lines are read as if by an Actor,
+    and may also be learnt, a hint (of `granularity`) at a time
+    """
+    # pylint: disable=import-outside-toplevel
+    from read_a_script.script_learner import (
+        ACTION_CHARACTER,
+        DEFAULT_CHARACTER,
+        ScriptReciter,
+    )
+
+    options = reciter.config.get("options") or {}
+    trim = options.get("cue-last-sentence", False)
+    speaker = ScriptReciter(reciter.script_file, [], reciter.config)
+    speaker.share(reciter)
+    # nothing is played while packing
+    speaker.__dict__["player"] = Player()
+    speaker.cast()
+    keys = set()
+    for scene in speaker.d.scenes:
+        for _, actor, line in speaker.scene_lines(scene):
+            speech = actor.speech(line)
+            if not speech:
+                continue
+            texts = [speech, trimmed_cue(speech)] if trim else [speech]
+            if actor.role not in (None, ACTION_CHARACTER, DEFAULT_CHARACTER):
+                hints = hint_chunks(line, granularity)
+                texts += hints
+                # what's left of the line, which is read if it's asked for after a hint
+                texts += [" ".join(hints[i:]) for i in range(1, len(hints))]
+            for text in texts:
+                key = clip_key(actor.voice.name, actor.rate, text)
+                if key not in keys:
+                    keys.add(key)
+                    yield actor.voice.name, actor.rate, text
+
+
+def _rendered(audio_cache, voice, rate, text):
+    """The key and contents of a clip, rendering it into the audio cache if it isn't there"""
+    while True:
+        path = audio_cache.clip(voice, rate, text)
+        try:
+            with open(path, "rb") as f:
+                return clip_key(voice, rate, text), f.read()
+        except FileNotFoundError:
+            # it was evicted before it could be read
+            pass
+
+
+def _json(value):
+    """`value` as UTF-8 JSON"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _little_endian(a):
+    """The bytes of the array `a`, little-endian"""
+    if sys.byteorder == "big":
+        a = array.array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _sections(source, d, index):
+    """(name, contents) of each section of a pack of the script `source`, parsed as `d` and indexed as `index`"""
+    yield "source", source
+    yield "script", _json(
+        {
+            "strings": d.strings,
+            "depths": sorted(d.depths.items()),
+            "title-values": d.title_values,
+        }
+    )
+    for name, attribute, _ in _ARRAYS:
+        yield name, _little_endian(getattr(d, attribute))
+    yield "index", _json(
+        [
+            [
+                s.header,
+                s.offset,
+                s.length,
+                s.characters,
+                s.lines,
+                s.words,
+                s.speeches,
+            ]
+            for s in index.scenes
+        ]
+    )
+
+
+def pack(reciter, pack_file, jobs=None):
+    """
+    Write a rehearsal pack of the ScriptReciter's script to `pack_file`,
+    rendering whatever speech isn't in its audio cache on up to `jobs` threads
+    (by default, options.render-workers). Returns how many clips the pack holds.
+    """
+    # pylint: disable=import-outside-toplevel
+    import concurrent.futures
+
+    from read_a_script.script_learner import hint_granularity
+
+    if reciter.pack is not None:
+        raise PackError(f"{reciter.script_file} is already a rehearsal pack")
+    options = dict(reciter.config.get("options") or {})
+    # the hints which are packed are the ones rehearsing from the pack gives
+    options["hint-granularity"] = hint_granularity(
+        options.get("hint-granularity", "word")
+    )
+    with open(reciter.script_file, "rb") as f:
+        source = f.read()
+    contents = {
+        "format": PACK_FORMAT,
+        "name": os.path.basename(reciter.script_file),
+        "voices": dict(reciter.config["voices"]),
+        "options": dict(
+            (name, options[name]) for name in PACKED_OPTIONS if name in options
+        ),
+        "voice-lines": list(reciter.voice_catalog.lines),
+        "sections": {},
+        "clips": {},
+    }
+    with scratch_cache(reciter.audio_cache) as audio_cache, replacing(
+        pack_file
+    ) as tmp, open(tmp, "wb") as out:
+        out.write(MAGIC)
+
+        def write(data):
+            start = out.tell()
+            out.write(data)
+            return start, len(data)
+
+        for name, data in _sections(source, reciter.d, reciter.index):
+            contents["sections"][name] = write(data)
+        workers = jobs or int(options.get("render-workers", 2))
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix="pack"
+        ) as pool:
+            futures = [
+                pool.submit(_rendered, audio_cache, voice, rate, text)
+                for voice, rate, text in _speech(reciter, options["hint-granularity"])
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                key, data = future.result()
+                contents["clips"][key] = write(data)
+        start, length = write(_json(contents))
+        out.write(_TRAILER.pack(start, length, MAGIC))
+    return len(contents["clips"])
+
+
+def unpack(reciter, directory):
+    """
+    Unpack the rehearsal pack which the ScriptReciter is reading into `directory`:
+    the script, as it was written, and a configuration file which reads it
+    (the reciter's own, with the pack's voices and options);
+    its clips go into the audio cache. Returns the paths of the files written.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ruamel.yaml import YAML
+
+    packed = reciter.pack
+    if packed is None:
+        raise PackError(f"{reciter.script_file} is not a rehearsal pack")
+    script_file = os.path.join(directory, packed.name)
+    config_file = os.path.join(directory, CONFIG_FILE)
+    for path in (script_file, config_file):
+        if os.path.exists(path):
+            raise PackError(f"{path} already exists: unpack somewhere else")
+    os.makedirs(directory, exist_ok=True)
+    write_atomically(script_file, packed.source)
+    defaults = dict(reciter.config.get("defaults") or {})
+    defaults["script-file"] = packed.name
+    config = io.StringIO()
+    YAML().dump(dict(reciter.config, defaults=defaults), config)
+    write_atomically(config_file, config.getvalue())
+    if reciter.audio_cache is not None:
+        for key in packed.contents["clips"]:
+            reciter.audio_cache.add(key, packed.clip(key))
+    return [script_file, config_file]
@@ -0,0 +1,85 @@
+"""
+Render upcoming lines in the background, so that they are ready to play by the time they're reached.
+"""
+
+import concurrent.futures
+import queue
+import threading
+
+from read_a_script.utils import logger
+
+
+class Lookahead:
+    """
+    Walks ahead of playback through a list of `jobs` - (position, voice, rate, texts) tuples, in order -
+    rendering each of a job's texts (a line, and any hints which may be given while it's learnt)
+    into the `audio_cache` on a pool of `workers` threads.
+
+    Rendered (or rendering) lines are handed towards playback through a queue holding at most `depth` of them,
+    so the renderers never get more than `depth` lines ahead of the line being played.
+    Playback picks the clips up from the audio cache, waiting for any which are still being rendered.
+    """
+
+    def __init__(self, audio_cache, jobs, depth=3, workers=2):
+        self.audio_cache = audio_cache
+        self._window = queue.Queue(maxsize=max(depth, 1))
+        self._head = None
+        self._position = 0
+        self._stopped = threading.Event()
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix="lookahead"
+        )
+        self._feeder = threading.Thread(
+            target=self._feed, args=(jobs,), name="lookahead-feeder", daemon=True
+        )
+        self._feeder.start()
+
+    def _render(self, voice, rate, text):
+        if self._stopped.is_set():
+            return None
+        try:
+            return self.audio_cache.clip(voice, rate, text, count=False)
+        # pylint: disable=broad-except
+        except Exception as e:
+            # playback will try again, and report the problem if it persists
+            logger.debug(f"Could not render {text!r} ahead of time: {e}")
+            return None
+
+    def _feed(self, jobs):
+        for position, voice, rate, texts in jobs:
+            if position < self._position:
+                # playback has already gone past this line
+                continue
+            futures = [
+                self._pool.submit(self._render, voice, rate, text) for text in texts
+            ]
+            while not self._stopped.is_set():
+                try:
+                    self._window.put((position, futures), timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if self._stopped.is_set():
+                return
+
+    def advance(self, position):
+        """
+        Playback has reached `position`: let go of the lines before it,
+        making room for the renderers to move on.
+        """
+        self._position = position
+        while True:
+            if self._head is None:
+                try:
+                    self._head = self._window.get_nowait()
+                except queue.Empty:
+                    return
+            if self._head[0] >= position:
+                return
+            self._head = None
+
+    def close(self):
+        """Stop rendering ahead"""
+        self._stopped.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._feeder.join()
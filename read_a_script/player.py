@@ -0,0 +1,52 @@
+"""
+How Actors make themselves heard: by default, one thing at a time, waiting for each to finish.
+"""
+
+import time
+
+from read_a_script import audio
+from read_a_script.voices import synthesizers
+
+
+class Skipped(Exception):
+    """The line being read was skipped (or rewound) while it was waiting for a key"""
+
+
+class Player:
+    """
+    Plays clips, speaks, pauses and reads keys on behalf of Actors, blocking until each is done,
+    so nothing can interrupt a line once it has started.
+    """
+
+    def __init__(self, synths=None):
+        self.synths = synths or synthesizers
+
+    def play(self, path):
+        """Play a rendered clip"""
+        audio.play(path)
+
+    def speak(self, voice, rate, text):
+        """Speak some text, synthesizing it as it is spoken"""
+        self.synths.get(voice, rate).say(text)
+
+    def pause(self, seconds):
+        """Do nothing for a while"""
+        time.sleep(seconds)
+
+    def key(self):
+        """Wait for a keypress, returning the key"""
+        # pylint: disable=import-outside-toplevel
+        import readchar
+
+        return readchar.readchar()
+
+    def read(self, actor, line, position):
+        """
+        Have `actor` read `line`, which is at `position` in the scene,
+        returning the position of the next line to read
+        """
+        actor.read_line(line)
+        return position + 1
+
+    def close(self):
+        """Stop playing"""
@@ -3,7 +3,15 @@
 # pylint: disable=line-too-long
 
 """Usage:
-  script_learner.py [-h] [-c CONFIG_FILE] [-dqLRV] [-r ROLE]... [-s SCENES] [-f SCRIPT_FILE]
+  script_learner.py [-h] [-c CONFIG_FILE] [-dqLRV] [--refresh-voices] [--stream] [--cues] [--watch] [--trace TRACE_FILE] [-r ROLE]... [-s SCENES] [--resume | --from POSITION | --from-quote TEXT] [-f SCRIPT_FILE]
+  script_learner.py --stats [-c CONFIG_FILE] [-dq] [-s SCENES] [--format FORMAT] [-f SCRIPT_FILE]
+  script_learner.py export [-c CONFIG_FILE] [-dq] [-r ROLE]... [-s SCENES] [-f SCRIPT_FILE] [-o OUTPUT_DIR] [-j JOBS]
+  script_learner.py pack [-c CONFIG_FILE] [-dq] [-f SCRIPT_FILE] [-j JOBS] PACK_FILE
+  script_learner.py unpack [-c CONFIG_FILE] [-dq] [-o OUTPUT_DIR] PACK_FILE
+  script_learner.py convert [-dq] [-j JOBS] LEGACY_DIR FOUNTAIN_DIR
+  script_learner.py daemon [-dq] [--stop | --foreground]
+  script_learner.py serve [-c CONFIG_FILE] [-dq] [-f SCRIPT_FILE] [-p PORT]
+  script_learner.py join [-dq] [-r ROLE]... [-m METHOD] [-s SCENES] [--cues] [-p PORT]
 
 Options:
   -c CONFIG_FILE, --config CONFIG_FILE    Read additional configuration from CONFIG_FILE [default: ./config.yml]
@@ -17,7 +25,55 @@ Options:
   -L, --list-scenes                       List all the scenes and exit
   -V, --list-voices                       List all known voices and exit
   -R, --list-roles                        List all known roles and exit
-  -f SCRIPT_FILE, --file SCRIPT_FILE      The Fountain-formatted script file
+  --stats                                 Report how many lines and words each role speaks in each scene,
+                                          and how long each scene takes to read, then exit
+  --format FORMAT                         How to write the --stats report: text, csv or json [default: text]
+  --refresh-voices                        Re-read the installed voices, rather than using the cached list
+  --stream                                Start learning while the script is still being parsed,
+                                          holding only the scenes in progress in memory
+  --resume                                Start from wherever you stopped last time you learnt this script
+  --from POSITION                         Start from POSITION, given as SCENE:LINE, where LINE counts
+                                          the paragraphs of the scene from 1 (for example, 3:12)
+  --from-quote TEXT                       Start from the line which best matches TEXT, a quotation from the script
+                                          (which needn't be exact, or complete)
+  --cues                                  Only read your lines, each preceded by its cues (see cue-lines below);
+                                          the rest of the script is skipped
+  --watch                                 Pick up changes to SCRIPT_FILE while you're learning it,
+                                          re-reading only the scenes which have changed
+  --trace TRACE_FILE                      Record how long each stage of reading each line takes to TRACE_FILE,
+                                          as JSON lines if it ends in .jsonl, otherwise as a Chrome trace,
+                                          and report how quickly cues were picked up
+  -f SCRIPT_FILE, --file SCRIPT_FILE      The Fountain-formatted script file, or a rehearsal pack (ending in .rehearsal)
+  -o OUTPUT_DIR, --output OUTPUT_DIR      Where to export one audio file per scene to,
+                                          or to unpack a rehearsal pack into [default: ./rehearsal]
+  -j JOBS, --jobs JOBS                    How many scenes to export at once (default: one per CPU),
+                                          how many lines to render at once while packing,
+                                          or how many scripts to convert at once (default: one per CPU)
+  --stop                                  Stop the daemon
+  -p PORT, --port PORT                    The port on this machine which the rehearsal server listens on [default: 8765]
+  -m METHOD, --method METHOD              How to learn your lines in a rehearsal (see learning-method below),
+                                          if not as the rehearsal server is configured to
+  --foreground                            Run the daemon in this process, rather than in the background
+
+The export command writes each selected scene to a WAV file, with silence in place of
+the lines of the role(s) being learnt, so that you can rehearse away from the computer.
+
+The pack command writes SCRIPT_FILE, the voice each role is read in and the rendered speech
+of every line to a rehearsal pack, PACK_FILE, which can be learnt from on another machine
+(with -f PACK_FILE) without parsing or synthesizing anything. The unpack command writes
+the script and a config.yml to read it with into OUTPUT_DIR, and the speech into the audio cache.
+
+SCRIPT_FILE can also be in the format of the original read-a-script.py, with a {scene} line
+starting each scene and `ROLE: line (direction)` for each line. The convert command turns
+every script in that format in LEGACY_DIR into a Fountain script in FOUNTAIN_DIR.
+
+The daemon command starts a daemon which keeps parsed scripts, the installed voices
+and rendered speech in memory. While it's running, script-learner hands every other command
+to it, so that listing scenes, roles or voices, or starting to learn, happens straight away.
+
+The serve command starts a rehearsal server, which several people on this machine can join
+(with the join command) to learn their own roles in SCRIPT_FILE at the same time.
+Everyone's lines are rendered once, into the server's audio cache, and played from there.
 
 For more information about formatting SCRIPT_FILE, see http://fountain.io
 
@@ -43,6 +99,39 @@ options:
   #  SPEAK_AND_DISPLAY
   # or an integer from 1 to 4
   learning-method: PAUSE_AND_DISPLAY
+  # where to keep cached data, such as parsed scripts [default: ~/.cache/read-a-script]
+  # cache-dir: ~/.cache/read-a-script
+  # whether to cache parsed scripts, so that they are only re-parsed when they change
+  parse-cache: true
+  # how long to remember the list of installed voices, in seconds
+  voice-cache-ttl: 86400
+  # whether to keep rendered speech, so that lines which have been heard before needn't be synthesized again
+  audio-cache: true
+  # where to keep rendered speech [default: audio under cache-dir]
+  # audio-cache-dir: ~/.cache/read-a-script/audio
+  # the most rendered speech to keep, in megabytes; the least recently played is discarded first
+  audio-cache-size: 500
+  # how many lines to render ahead of the one being spoken (0 to render each line as it's reached)
+  lookahead: 3
+  # how many lines to render at once while looking ahead
+  render-workers: 2
+  # how much of your line each hint gives, with WAIT_FOR_INPUT: a word, a phrase (a few words),
+  # or everything up to the next punctuation: valid values are word, phrase or punctuation
+  hint-granularity: word
+  # whether to read only your lines and their cues, skipping the rest of the script (as --cues does)
+  cue-only: false
+  # how many lines to read as the cue for each of your lines, when reading only cues
+  cue-lines: 1
+  # whether to read only the last sentence of each cue line
+  cue-last-sentence: false
+  # whether a keypress can cut short the line being read (skipping the rest of it, or going back a line with B)
+  barge-in: true
+  # how to play rendered speech: afplay, starting a process for each line,
+  # or stream, in this process through one output stream, with no gaps between lines
+  playback: afplay
+  # where streamed speech goes: device (the sound card, which needs the sounddevice package),
+  # null (nowhere, for testing), or the path of a WAV file to record it in
+  playback-sink: device
 
 defaults:
   # the default role to use (case-insensitive)
@@ -52,19 +141,53 @@ defaults:
 """
 
 import enum
+import functools
 import os
 import re
-import subprocess
 import sys
+import typing
 
 import docopt
-import readchar
-from jouvence.parser import JouvenceParser
-from loguru import logger
-from macos_speech import Synthesizer, Voice
-from ruamel.yaml import YAML
 
-from read_a_script.utils import ElementType, mixrange
+from read_a_script.audio import AudioCache, clip_key
+from read_a_script.cache import (
+    cache_dir,
+    index_script,
+    index_words,
+    load_config,
+    parse_script,
+    tally_script,
+)
+from read_a_script.duration import DurationModel
+from read_a_script.index import ScriptIndex
+from read_a_script.pack import PackError, RehearsalPack, is_pack, pack, unpack
+from read_a_script.pipeline import Lookahead
+from read_a_script.player import Player
+from read_a_script.session import POSITIONS_FILE, Bookmarks, parse_position
+from read_a_script.streaming import SceneStream
+from read_a_script.telemetry import telemetry
+from read_a_script.utils import (
+    ACTION_TYPES,
+    HINT_GRANULARITIES,
+    SPOKEN_TYPES,
+    ElementType,
+    hint_chunks,
+    logger,
+    mixrange,
+    trimmed_cue,
+)
+from read_a_script.voices import (
+    DEFAULT_TTL,
+    SynthesizerPool,
+    UnknownVoiceError,
+    VoiceCatalog,
+    synthesizers,
+)
+
+# The speech stack, YAML and keyboard input are imported where they're used,
+# so that commands which don't need them start up quickly.
+if typing.TYPE_CHECKING:
+    from macos_speech import Voice
 
 ACTION_CHARACTER = "_ACTION"
 DEFAULT_CHARACTER = "_DEFAULT"
@@ -72,6 +195,9 @@ DEFAULT_CONFIG = __doc__.split("---\n")[1]
 
 DEFAULT_VOICE = "Daniel"
 
+CHARACTER = ElementType.CHARACTER.value
+PARENTHETICAL = ElementType.PARENTHETICAL.value
+
 
 class LearningMethod(enum.Enum):
     """enum"""
@@ -82,33 +208,105 @@ class LearningMethod(enum.Enum):
     SPEAK_AND_DISPLAY = enum.auto()
 
 
+def learning_method(value) -> LearningMethod:
+    """
+    The LearningMethod with the name `value`, or the number `value` (counting from 1),
+    raising ValueError if there isn't one
+    """
+    try:
+        return LearningMethod[value]
+    except KeyError:
+        pass
+    try:
+        return LearningMethod(int(value))
+    except (TypeError, ValueError):
+        # pylint: disable=raise-missing-from
+        raise ValueError(
+            f"{value!r} is not a learning method: use one of {', '.join(LearningMethod.__members__)}, or 1 to {len(LearningMethod)}"
+        )
+
+
+def hint_granularity(value) -> str:
+    """
+    The hint granularity `value` (one of HINT_GRANULARITIES, in any case),
+    raising ValueError if it isn't one
+    """
+    granularity = str(value).lower()
+    if granularity not in HINT_GRANULARITIES:
+        raise ValueError(
+            f"{value!r} is not a hint granularity: use one of {', '.join(HINT_GRANULARITIES)}"
+        )
+    return granularity
+
+
 class Actor:
     """
     An Actor displays lines that it is given, while reading them out in its selected voice.
+
+    Actors are lightweight: the synthesizer that does the speaking is shared
+    with every other Actor who has the same voice and rate, and is only set up when it's first needed.
     """
 
-    def __init__(self, config, role, voice: Voice):
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        config,
+        role,
+        voice: "Voice",
+        audio_cache: AudioCache = None,
+        synths: SynthesizerPool = None,
+        player: Player = None,
+    ):
         self.role = role
         self.voice = voice
-        self.synth = Synthesizer(voice=voice.name)
         self.config = config
+        self.audio_cache = audio_cache
+        self.synths = synths or synthesizers
+        self.player = player or Player(self.synths)
+        self.rate = None
         if "rate" in self.config["options"]:
-            self.synth.rate = int(self.config["options"]["rate"])
+            self.rate = int(self.config["options"]["rate"])
+
+    @property
+    def synth(self):
+        "The synthesizer for this actor's voice and rate."
+        return self.synths.get(self.voice.name, self.rate)
+
+    def say(self, text):
+        "Speak some text aloud, playing it from the audio cache if there is one."
+        if self.audio_cache is not None:
+            path = self.audio_cache.clip(self.voice.name, self.rate, text)
+            telemetry.audio_started(self.voice.name)
+            with telemetry.span("play", voice=self.voice.name):
+                self.player.play(path)
+        else:
+            telemetry.audio_started(self.voice.name)
+            with telemetry.span("synthesis", voice=self.voice.name, chars=len(text)):
+                self.player.speak(self.voice.name, self.rate, text)
 
     def read_line(self, line):
         "Display a line and speak it aloud."
         self.display_line(line)
         self.speak_line(line)
 
-    def speak_line(self, line):
-        "Speak a line of action aloud."
+    def speech(self, line):
+        "The text which will be spoken aloud when reading a line, or None if nothing will be."
         if self.role == ACTION_CHARACTER and not self.config["options"].get(
             "speak-action", True
         ):
-            return
+            return None
+        return line or None
+
+    def hints(self, line):
+        "The hints which may be spoken, one at a time, while reading a line: none, unless it's being learnt."
+        return ()
+
+    def speak_line(self, line):
+        "Speak a line of action aloud."
+        line = self.speech(line)
         if line:
             # macos_speech barfs if lines end in a hyphen
-            self.synth.say(re.sub("-\n", "- ", line))
+            self.say(re.sub("-\n", "- ", line))
 
     def display_line(self, line, include_character=True):
         "Display a line of action without speaking it."
@@ -134,34 +332,49 @@ class LearningActor(Actor):
     - it waits for a keypress, then displays the next word or the entire line (depending on what key is pressed);
     - it displays the line, then pauses for the length of time it would take for the line to be read;
     - or, it behaves exactly like an Actor.
+
+    The length of the pauses is predicted by a DurationModel, rather than by speaking the line.
+    Lines which are waited for are split into hints once, so that the hints can be rendered ahead of time.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, durations: DurationModel = None, **kwargs):
         super(LearningActor, self).__init__(*args, **kwargs)
-        lm = self.config["options"]["learning-method"]
-        try:
-            self.learning_method = LearningMethod[lm]
-        except KeyError:
-            self.learning_method = LearningMethod(int(lm))
+        self.durations = durations or DurationModel()
+        self.learning_method = learning_method(
+            self.config["options"]["learning-method"]
+        )
+        self.hint_granularity = hint_granularity(
+            self.config["options"].get("hint-granularity", "word")
+        )
+        self._hints = {}
         if self.learning_method == LearningMethod.WAIT_FOR_INPUT:
             self.print_help_interactive()
 
-    def _mute_unmute_output(self, muted: bool):
-        subprocess.run(
-            ["osascript", "-e", f"set volume output muted {muted}"], check=False
-        )
-
     def silent_speak_line(self, line):
         """
-        Same as speak_line but mutes the volume - so it effectively pauses for the right length of time.
+        Pause for the length of time it would take to speak the line.
         :param line:
         :return:
         """
         if not line:
             return
-        self._mute_unmute_output(True)
-        self.synth.say(line)
-        self._mute_unmute_output(False)
+        self.player.pause(self.durations.estimate(self.voice.name, self.rate, line))
+
+    def speech(self, line):
+        if self.learning_method in (
+            LearningMethod.PAUSE_AND_DISPLAY,
+            LearningMethod.DISPLAY_AND_PAUSE,
+        ):
+            return None
+        return super().speech(line)
+
+    def hints(self, line):
+        if self.learning_method != LearningMethod.WAIT_FOR_INPUT or not line:
+            return ()
+        hints = self._hints.get(line)
+        if hints is None:
+            hints = self._hints[line] = hint_chunks(line, self.hint_granularity)
+        return hints
 
     def speak_line(self, line):
         if self.learning_method == LearningMethod.SPEAK_AND_DISPLAY:
@@ -185,32 +398,36 @@ class LearningActor(Actor):
         super().read_line(line)
 
     def read_line_interactive(self, line):
-        """Read the line one word at a time"""
+        """Read the line one hint at a time"""
         self.display_character()
+        hints = self.hints(line)
+        given = 0
         while True:
             sys.stdout.flush()
-            say_it = readchar.readchar().lower()
+            say_it = self.player.key().lower()
+            telemetry.keypress()
             if say_it == "\x03":
                 raise KeyboardInterrupt
             elif say_it == "\x04":
                 raise EOFError
             elif say_it == "h":
-                if " " in line:
-                    hint, line = re.split(r"\s+", line, 1)
-                else:
-                    hint, line = line, None
-                self.synth.say(hint)
-                sys.stdout.write(hint + " ")
-                sys.stdout.flush()
-                if line is None:
+                if given < len(hints):
+                    hint = hints[given]
+                    given += 1
+                    self.say(hint)
+                    sys.stdout.write(hint + " ")
+                    sys.stdout.flush()
+                if given >= len(hints):
                     sys.stdout.write("\n")
                     return
+                # what's left of the line
+                line = " ".join(hints[given:])
             elif say_it in (" ", "n"):
                 print(line)
                 return
             elif say_it in ("\x013", "y"):
                 print(line)
-                self.synth.say(line)
+                self.say(line)
                 return
             else:
                 self.print_help_interactive()
@@ -244,51 +461,432 @@ class ScriptReciter:
     Read out the script
     """
 
-    def __init__(self, script_file, roles, config):
-        self.parser = JouvenceParser()
-        self.d = self.parser.parse(script_file)
+    def __init__(self, script_file, roles, config, refresh_voices=False):
+        self.script_file = script_file
+        self.refresh_voices = refresh_voices
         self.roles = list(map(lambda x: x.upper(), roles))
         self.config = config
+        if self.pack is not None:
+            # rehearse with the voices and options which the pack's speech was rendered with
+            self.config = self.pack.configure(config)
 
         self.current_role = None
         self.current_actor = None
+        # the scene and line being read, counting from 1
+        self.position = None
+        # the LiveScript following the script's file, when watching it for changes,
+        # and how its scenes have moved each time it has changed
+        self.live = None
+        self.changes = []
 
-        self.voices = dict((v.name.capitalize(), v) for v in Synthesizer().voices)
         self.actors = {}
 
-    def learn(self, scenes=None):
+    def share(self, other):
         """
-        Learn the selected scenes
+        Use whatever another ScriptReciter for the same script has already loaded -
+        the parsed script, its indexes and tally, the installed voices, the audio cache and the duration model -
+        rather than loading it again; a ScriptReciter for any other script is ignored
         """
-        print("You are learning: " + ", ".join(self.roles))
+        if os.path.abspath(other.script_file) != os.path.abspath(self.script_file):
+            return
+        shared = ["d", "index", "tally", "words", "audio_cache", "durations", "pack"]
+        if not self.refresh_voices:
+            shared.append("voice_catalog")
+        for name in shared:
+            if name in other.__dict__:
+                self.__dict__[name] = other.__dict__[name]
+
+    def _parse_cache_dir(self):
+        options = self.config.get("options") or {}
+        return cache_dir(self.config) if options.get("parse-cache", True) else None
+
+    @functools.cached_property
+    def pack(self):
+        """The RehearsalPack which the script is in, or None if the script file is a Fountain script"""
+        return RehearsalPack(self.script_file) if is_pack(self.script_file) else None
+
+    @functools.cached_property
+    def d(self):
+        """The parsed script, which is only loaded when it's first needed"""
+        with telemetry.span("load-script"):
+            if self.pack is not None:
+                return self.pack.script
+            return parse_script(self.script_file, self._parse_cache_dir())
+
+    def _derived(self, kind, cached):
+        """
+        What `kind.build` derives from the parsed script: built from it if it's already loaded
+        (or is in a pack, or parsed scripts aren't cached), otherwise taken from the cache by `cached`
+        """
+        if (
+            self.pack is not None
+            or "d" in self.__dict__
+            or self._parse_cache_dir() is None
+        ):
+            return kind.build(self.d)
+        return cached(self.script_file, self._parse_cache_dir())
+
+    @functools.cached_property
+    def index(self):
+        """The ScriptIndex of the script, which is only loaded when it's first needed"""
+        if self.pack is not None:
+            return self.pack.index
+        return self._derived(ScriptIndex, index_script)
+
+    @functools.cached_property
+    def tally(self):
+        """The ScriptTally of the script, which its statistics are worked out from"""
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.stats import ScriptTally
+
+        return self._derived(ScriptTally, tally_script)
+
+    @functools.cached_property
+    def words(self):
+        """The WordIndex of the script, which finds quotations in it"""
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.search import WordIndex
+
+        return self._derived(WordIndex, index_words)
+
+    @functools.cached_property
+    def player(self):
+        """
+        What the actors play their lines through:
+        a PlaybackEngine if lines can be interrupted from the keyboard, otherwise a Player;
+        either plays through a StreamPlayer if options.playback is stream
+        """
+        options = self.config.get("options") or {}
+        playback = options.get("playback", "afplay")
+        stream = None
+        if playback == "stream":
+            # pylint: disable=import-outside-toplevel
+            from read_a_script.sound import StreamPlayer, sink_for
+
+            stream = StreamPlayer(sink_for(options.get("playback-sink", "device")))
+        elif playback != "afplay":
+            raise ValueError(f"{playback!r} is not a way to play: use afplay or stream")
+        if options.get("barge-in", True) and sys.stdin.isatty():
+            # pylint: disable=import-outside-toplevel
+            from read_a_script.engine import PlaybackEngine
+
+            return PlaybackEngine(stream=stream)
+        return stream or Player()
+
+    @functools.cached_property
+    def voice_catalog(self):
+        """
+        The voices installed on this machine, which are only enumerated when they're first needed -
+        or, for a rehearsal pack, those which were installed when it was made
+        """
+        if self.pack is not None:
+            return self.pack.voice_catalog
+        options = self.config.get("options") or {}
+        return VoiceCatalog(
+            cache_dir(self.config),
+            ttl=int(options.get("voice-cache-ttl", DEFAULT_TTL)),
+            refresh=self.refresh_voices,
+        )
+
+    @functools.cached_property
+    def durations(self):
+        """The model used to predict how long lines take to speak"""
+        return DurationModel(os.path.join(cache_dir(self.config), "durations.json"))
+
+    @functools.cached_property
+    def bookmarks(self):
+        """Where each script was left off"""
+        return Bookmarks(os.path.join(cache_dir(self.config), POSITIONS_FILE))
+
+    @functools.cached_property
+    def audio_cache(self):
+        """
+        The cache of rendered speech, or None if it's switched off (which it can't be for a rehearsal pack,
+        whose speech is copied into the cache as it's needed)
+        """
+        options = self.config.get("options") or {}
+        if not options.get("audio-cache", True) and self.pack is None:
+            return None
+        return AudioCache(
+            os.path.expanduser(
+                options.get("audio-cache-dir")
+                or os.path.join(cache_dir(self.config), "audio")
+            ),
+            int(options.get("audio-cache-size", 500)) * 1_000_000,
+            durations=self.durations,
+            packed=self.pack,
+        )
+
+    @property
+    def voices(self):
+        """The installed voices, keyed by capitalised name"""
+        return self.voice_catalog.voices
+
+    def check_voices(self):
+        """
+        Check that every voice in the configuration is installed,
+        raising UnknownVoiceError if any of them are not.
+        """
+        voices = dict(self.config["voices"])
+        voices.setdefault(DEFAULT_CHARACTER, DEFAULT_VOICE)
+        self.voice_catalog.check(voices)
+
+    def check_scenes(self, scenes):
+        """
+        Check that all the given scene numbers are in the script,
+        raising IndexError if any of them are not.
+        """
+        for i in scenes or ():
+            self.index.scene(i)
+
+    def check_position(self, position, scenes=None):
+        """
+        Check that a (scene, line) position is in the script, and among the given scenes if there are any,
+        raising IndexError if it is not.
+        """
+        number, line = position
+        scene = self.index.scene(number)
+        if not 1 <= line <= max(scene.length, 1):
+            raise IndexError(
+                f"There is no line {line} in scene {number}: it has {scene.length} lines"
+            )
+        if scenes is not None and number not in scenes:
+            raise IndexError(f"Scene {number} is not one of the scenes being learnt")
+
+    def find_quote(self, quotation, scenes=None):
+        """
+        Where the paragraph which best matches a quotation is, as a (scene, line) position,
+        looking only in the given scenes if there are any;
+        raise ValueError if nothing matches it well enough
+        """
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.search import scene_line
+
+        self.check_scenes(scenes)
+        within = None
+        if scenes is not None:
+            offsets = self.d.scene_offsets
+            ranges = [range(offsets[n - 1], offsets[n]) for n in set(scenes)]
+
+            def in_scenes(position):
+                return any(position in r for r in ranges)
+
+            within = in_scenes
+
+        with telemetry.span("find-quote"):
+            found = self.words.search(quotation, within)
+        if not found:
+            raise ValueError(f"Could not find {quotation!r} in {self.script_file}")
+        return scene_line(self.d, found[0][0])
+
+    def saved_position(self):
+        """
+        Where you stopped last time you learnt this script, as a (scene, line) pair - or None if you didn't stop part way
+        """
+        saved = self.bookmarks.get(self.script_file)
+        if saved is None:
+            return None
+        if saved["roles"] != self.roles:
+            logger.warning(
+                f"The saved position was reached learning {', '.join(saved['roles'])}"
+            )
+        return saved["scene"], saved["line"]
+
+    def stream_scenes(self, scenes=None):
+        """
+        Yield the selected scenes (or all of them) in the order given, along with their numbers,
+        while the script is parsed in the background.
+        Scenes are only held in memory until they've been learnt.
+        """
+        stream = SceneStream(self.script_file, scenes)
         if scenes is None:
-            scenes = self.d.scenes
+            yield from stream
+            return
+        pending = list(scenes)
+        held = {}
+        for number, scene in stream:
+            held[number] = scene
+            while pending and pending[0] in held:
+                number = pending.pop(0)
+                yield number, held[number] if number in pending else held.pop(number)
+        for number in dict.fromkeys(pending):
+            logger.warning(
+                f"There is no scene {number}: the script has {stream.count} scenes"
+            )
+
+    def selected_scenes(self, scenes=None, first=1):
+        """
+        Yield the scenes with the given numbers in the order given, or every scene from number `first` on,
+        along with their numbers. If the script changes along the way, the scenes still to come
+        are looked up again; when learning every scene, that includes any new ones.
+        """
+        pending = None if scenes is None else list(scenes)
+        number = first - 1
+        seen = len(self.changes)
+        while True:
+            for origins in self.changes[seen:]:
+                number = _renumber(number, origins)
+                if pending is not None:
+                    pending = [_renumber(n, origins) for n in pending]
+            seen = len(self.changes)
+            if pending is None:
+                number += 1
+            elif pending:
+                number = pending.pop(0)
+            else:
+                return
+            if number > len(self.d.scenes):
+                if pending is None:
+                    return
+                continue
+            yield number, self.d.scenes[number - 1]
+
+    def reload(self):
+        """
+        If the script is being watched and has changed, switch to its new version:
+        re-index the scenes which have changed, and discard the speech rendered for lines which have gone.
+        Return None if nothing has changed; otherwise, for each scene of the new version,
+        the number (counting from 0) of the scene of the old version which it is a copy of,
+        or None if it is new or has changed.
+        """
+        if self.live is None:
+            return None
+        origins = self.live.reload()
+        if origins is None:
+            return None
+        old = self.d
+        self.__dict__["index"] = self.index.update(self.live.script, origins)
+        self.__dict__["d"] = self.live.script
+        self.__dict__.pop("tally", None)
+        self.__dict__.pop("words", None)
+        self.changes.append(origins)
+        changed = [i for i, origin in enumerate(origins) if origin is None]
+        if self.audio_cache is not None:
+            kept = set(origins)
+            stale = set()
+            for i, scene in enumerate(old.scenes):
+                if i not in kept:
+                    stale |= self.clip_keys(scene)
+            for i in changed:
+                stale -= self.clip_keys(self.d.scenes[i])
+            self.audio_cache.discard(stale)
+        print(
+            "The script has changed: "
+            + (
+                "re-reading scene(s) " + ", ".join(str(i + 1) for i in changed)
+                if changed
+                else "some scenes have been removed or moved"
+            )
+            + "\n"
+        )
+        return origins
+
+    def clip_keys(self, scene):
+        """The keys of the rendered speech which reading a scene would play"""
+        keys = set()
+        for _, actor, line in self.scene_lines(scene):
+            speech = actor.speech(line)
+            if speech:
+                for text in (speech,) + actor.hints(line):
+                    keys.add(clip_key(actor.voice.name, actor.rate, text))
+        return keys
+
+    # pylint: disable=too-many-arguments
+    def learn(
+        self, scenes=None, stream=False, cues_only=False, start=None, watch=False
+    ):
+        """
+        Learn the selected scenes, or only the cues for your lines in them,
+        starting from a (scene, line) position if one is given,
+        and following changes to the script's file if `watch` is set.
+        If you stop part way through, the position you stopped at is saved.
+        """
+        print("You are learning: " + ", ".join(self.roles))
+        # reading only the cues, starting part way through or watching for changes
+        # needs the whole script, so none of them can be streamed; nor need a pack's, which is already parsed
+        stream = (
+            stream
+            and not cues_only
+            and start is None
+            and not watch
+            and self.pack is None
+        )
+        if stream:
+            scenes = self.stream_scenes(scenes)
         else:
-            scenes = [self.d.scenes[i - 1] for i in scenes]
-        for scene in scenes:
-            self.learn_scene(scene)
+            first = 1
+            if start is not None:
+                if scenes is None:
+                    first = start[0]
+                else:
+                    scenes = scenes[list(scenes).index(start[0]) :]
+                print(f"Starting from scene {start[0]}, line {start[1]}")
+            if watch:
+                # pylint: disable=import-outside-toplevel
+                from read_a_script.watch import LiveScript
+
+                self.live = LiveScript(
+                    self.script_file, self.d, self._parse_cache_dir()
+                )
+            scenes = self.selected_scenes(scenes, first)
+            self.cast()
+        finished = False
+        try:
+            for number, scene in scenes:
+                line = 1
+                if start is not None and number == start[0]:
+                    line, start = start[1], None
+                self.learn_scene(scene, cues_only, start=line - 1, number=number)
+            finished = True
+        finally:
+            if finished:
+                self.bookmarks.clear(self.script_file)
+            elif self.position is not None:
+                self.bookmarks.set(self.script_file, *self.position, self.roles)
+            self.bookmarks.save()
+            self.player.close()
+            if self.audio_cache is not None:
+                self.audio_cache.log_stats()
+            self.durations.save()
 
     def list_scenes(self):
         """
         List all the scenes in the play
         """
-        for i, scene in enumerate(self.d.scenes, 1):
+        for i, scene in enumerate(self.index.scenes, 1):
             print(f"{i:-8d}: {scene.header}")
 
+    def stats(self, scenes=None):
+        """
+        How many lines and words each role speaks in the selected scenes (or all of them), and how long they take to say,
+        as a ScriptStats; action is counted as the lines of _ACTION, if it's spoken
+        """
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.stats import script_stats
+
+        options = self.config.get("options") or {}
+        voices = self.config["voices"]
+
+        def voice_for(role):
+            return voices[role].capitalize() if role in voices else DEFAULT_VOICE
+
+        with telemetry.span("stats"):
+            stats = script_stats(
+                self.tally,
+                voice_for,
+                rate=int(options["rate"]) if "rate" in options else None,
+                durations=self.durations,
+                action=(
+                    ACTION_CHARACTER if options.get("speak-action", True) else None
+                ),
+            )
+        return stats if scenes is None else stats.select(scenes)
+
     def list_roles(self):
         """
         List all the roles in the play
         """
-        roles = set()
-        for scene in self.d.scenes:
-            roles.update(
-                set(
-                    p.text
-                    for p in scene.paragraphs
-                    if p.type == ElementType.CHARACTER.value
-                )
-            )
-        for role in sorted(roles):
+        for role in self.index.roles:
             print(role)
 
     def list_voices(self):
@@ -299,39 +897,193 @@ class ScriptReciter:
         for voice in self.voices.values():
             print(f"\t{voice.name} (f{voice.lang})")
 
-    def learn_scene(self, scene):
+    def scene_lines(self, scene, start=0):
         """
-        Learn an individual scene
+        Work out who reads what in a scene, from the paragraph at position `start` onwards,
+        yielding a (position, actor, line) triple for each line to be read,
+        where `position` is that of the paragraph the line comes from.
         """
         self.current_actor = self.get_actor(ACTION_CHARACTER)
-        self.current_actor.read_line("Scene: " + (scene.header or ""))
-        for p in scene.paragraphs:
-            p_type = ElementType(p.type)
-            if p_type in (
-                ElementType.ACTION,
-                ElementType.CENTERED_ACTION,
-                ElementType.TRANSITION,
-                ElementType.SYNOPSIS,
-            ):
+        yield start, self.current_actor, "Scene: " + (scene.header or "")
+        paragraphs = scene.paragraphs
+        if start:
+            # jump straight to the paragraph, picking up whoever is speaking it
+            if start < len(paragraphs) and paragraphs[start].character is not None:
+                self.current_actor = self.get_actor(paragraphs[start].character)
+            paragraphs = paragraphs[start:]
+        for position, p in enumerate(paragraphs, start):
+            p_type = p.type
+            if p_type in ACTION_TYPES:
                 self.current_actor = self.get_actor(ACTION_CHARACTER)
-                self.current_actor.read_line(p.text)
-            elif p_type == ElementType.CHARACTER:
+                yield position, self.current_actor, p.text
+            elif p_type == CHARACTER:
                 self.current_actor = self.get_actor(p.text)
-            elif p_type in (ElementType.DIALOG, ElementType.LYRICS):
-                self.current_actor.read_line(p.text)
-            elif p_type == ElementType.PARENTHETICAL:
-                self.get_actor(ACTION_CHARACTER).read_line(p.text)
+            elif p_type in SPOKEN_TYPES:
+                yield position, self.current_actor, p.text
+            elif p_type == PARENTHETICAL:
+                yield position, self.get_actor(ACTION_CHARACTER), p.text
             else:
-                self.get_actor(DEFAULT_CHARACTER).read_line(p.text)
+                yield position, self.get_actor(DEFAULT_CHARACTER), p.text
+
+    def cue_lines(self, scene, start=0):
+        """
+        Work out what to read in a scene when only rehearsing cues, for your lines from position `start` onwards:
+        a (position, actor, line) triple for each of your lines, preceded by the lines of dialogue or action
+        leading up to it (as many as `cue-lines`, since your last line), all with the position of your line.
+        Your lines are found through the index; nothing else in the scene is looked at.
+        """
+        options = self.config.get("options") or {}
+        depth = int(options.get("cue-lines", 1))
+        trim = options.get("cue-last-sentence", False)
+        speeches = self.index.scenes[scene.number].speeches
+        mine = sorted(
+            i for role in self.roles for i in speeches.get(role, ()) if i >= start
+        )
+        if not mine:
+            return
+        yield mine[0], self.get_actor(ACTION_CHARACTER), "Scene: " + (
+            scene.header or ""
+        )
+        paragraphs = scene.paragraphs
+        previous = -1
+        for position in mine:
+            cues = []
+            i = position - 1
+            while i > previous and len(cues) < depth:
+                p = paragraphs[i]
+                if p.type in SPOKEN_TYPES:
+                    cues.append((self.get_actor(p.character), p.text))
+                elif p.type in ACTION_TYPES:
+                    cues.append((self.get_actor(ACTION_CHARACTER), p.text))
+                i -= 1
+            for actor, line in reversed(cues):
+                if trim:
+                    line = trimmed_cue(line)
+                yield position, actor, line
+            p = paragraphs[position]
+            yield position, self.get_actor(p.character), p.text
+            previous = position
+
+    def lookahead(self, lines):
+        """
+        Start rendering the given (position, actor, line) triples in the background,
+        along with the hints for any which are waited for (splitting them into hints as the scene loads),
+        returning a Lookahead - or None if there's nothing to render them into.
+        """
+        options = self.config.get("options") or {}
+        depth = int(options.get("lookahead", 3))
+        if self.audio_cache is None or depth <= 0:
+            return None
+        jobs = []
+        for position, (_, actor, line) in enumerate(lines):
+            speech = actor.speech(line)
+            if speech:
+                # hints come first, as they're asked for before the whole line is
+                texts = actor.hints(line) + (speech,)
+                jobs.append((position, actor.voice.name, actor.rate, texts))
+        return Lookahead(
+            self.audio_cache,
+            jobs,
+            depth=depth,
+            workers=int(options.get("render-workers", 2)),
+        )
+
+    def learn_scene(self, scene, cues_only=False, start=0, number=None):
+        """
+        Learn an individual scene, or only the cues for your lines in it,
+        from the paragraph at position `start` onwards.
+        If the scene's `number` is given, `position` follows the line being read.
+        """
+        telemetry.scene = scene.header
+        lines = list(
+            self.cue_lines(scene, start)
+            if cues_only
+            else self.scene_lines(scene, start)
+        )
+        lookahead = self.lookahead(lines)
+        position = 0
+        try:
+            while position < len(lines):
+                origins = self.reload() if number is not None else None
+                if origins is not None:
+                    if number - 1 in origins:
+                        # this scene hasn't changed, but may have moved
+                        number = _renumber(number, origins)
+                    elif number <= len(self.d.scenes):
+                        # carry on from the same paragraph of the new version of the scene
+                        scene = self.d.scenes[number - 1]
+                        telemetry.scene = scene.header
+                        paragraph = min(lines[position][0], len(scene.paragraphs))
+                        lines = list(
+                            self.cue_lines(scene, paragraph)
+                            if cues_only
+                            else self.scene_lines(scene, paragraph)
+                        )
+                        if lookahead is not None:
+                            lookahead.close()
+                        lookahead = self.lookahead(lines)
+                        position = 0
+                        continue
+                    else:
+                        return
+                if lookahead is not None:
+                    lookahead.advance(position)
+                paragraph, actor, line = lines[position]
+                if number is not None:
+                    self.position = (number, paragraph + 1)
+                position = self.player.read(actor, line, position)
+                telemetry.cue()
+        finally:
+            if lookahead is not None:
+                lookahead.close()
+
+    def cast(self, characters=None):
+        """
+        Resolve characters to Actors up front - every character in the script, unless some are given -
+        so that reading the script only has to look them up.
+        Characters with no voice of their own are reported together.
+        """
+        if characters is None:
+            characters = self.index.roles
+        unvoiced = []
+        with telemetry.span("cast"):
+            for character_name in [ACTION_CHARACTER, DEFAULT_CHARACTER] + list(
+                characters
+            ):
+                if character_name not in self.actors:
+                    self.actors[character_name] = self._new_actor(
+                        character_name, unvoiced
+                    )
+        if unvoiced:
+            logger.warning(
+                f"Could not find {', '.join(unvoiced)} in configuration.voices - using {DEFAULT_VOICE}"
+            )
 
     def get_actor(self, character_name) -> Actor:
         """
         Get the Actor object for the given character
         """
-        if character_name is not None:
-            character_name = character_name.strip()
-        if character_name in self.actors:
+        try:
             return self.actors[character_name]
+        except KeyError:
+            pass
+        name = character_name.strip() if character_name is not None else None
+        if name not in self.actors:
+            unvoiced = []
+            with telemetry.span("actor-lookup", character=name):
+                self.actors[name] = self._new_actor(name, unvoiced)
+            if unvoiced:
+                logger.warning(
+                    f"Could not find {name} in configuration.voices - using {DEFAULT_VOICE}"
+                )
+        self.actors[character_name] = self.actors[name]
+        return self.actors[name]
+
+    def _new_actor(self, character_name, unvoiced) -> Actor:
+        """
+        Make an Actor for the given (stripped) character name,
+        adding the name to `unvoiced` if it has no voice configured
+        """
         if character_name in self.config["voices"]:
             voice_name = self.config["voices"][character_name].capitalize()
             if voice_name in self.voices:
@@ -342,38 +1094,49 @@ class ScriptReciter:
                 )
                 voice = self.voices[DEFAULT_VOICE]
         else:
-            if character_name != ACTION_CHARACTER:
-                logger.warning(
-                    f"Could not find {character_name} in configuration.voices - using {DEFAULT_VOICE}"
-                )
+            if character_name not in (ACTION_CHARACTER, DEFAULT_CHARACTER):
+                unvoiced.append(character_name)
             voice = self.voices[DEFAULT_VOICE]
         if character_name is None:
-            actor = Actor(self.config, None, voice)
+            actor = Actor(
+                self.config, None, voice, self.audio_cache, player=self.player
+            )
         elif character_name in self.roles:
-            actor = LearningActor(self.config, character_name, voice)
+            actor = LearningActor(
+                self.config,
+                character_name,
+                voice,
+                self.audio_cache,
+                player=self.player,
+                durations=self.durations,
+            )
         else:
-            actor = Actor(self.config, character_name, voice)
-        self.actors[character_name] = actor
+            actor = Actor(
+                self.config, character_name, voice, self.audio_cache, player=self.player
+            )
         return actor
 
 
-@logger.catch
-def main():
+def _renumber(number, origins):
     """
-    The show must go on
+    The number of a scene in a new version of the script, given its number in the old one,
+    and the `origins` of the new version's scenes (as returned by ScriptReciter.reload).
+    A scene which has changed keeps its number.
     """
-    opts = docopt.docopt(__doc__, sys.argv[1:])
+    if number - 1 in origins:
+        return origins.index(number - 1) + 1
+    return number
 
+
+def learner_for(opts):
+    """
+    The ScriptReciter for the configuration, roles and script file given by the command line options
+    """
     if "--config" in opts and os.path.exists(opts["--config"]):
-        # pylint: disable=W1514
-        config = YAML().load(open(opts["--config"]).read())
+        config = load_config(opts["--config"])
     else:
-        config = YAML().load(DEFAULT_CONFIG)
+        config = load_config(default=DEFAULT_CONFIG)
 
-    if DEFAULT_CHARACTER in config["voices"]:
-        # pylint: disable=W0603
-        global DEFAULT_VOICE
-        DEFAULT_VOICE = config["voices"][DEFAULT_CHARACTER]
     role = script_file = None
     if "defaults" in config:
         if "role" in config["defaults"]:
@@ -386,18 +1149,194 @@ def main():
         role = opts["--role"]
     if script_file is None:
         script_file = opts["--file"]
-    learner = ScriptReciter(script_file, role, config)
+    return ScriptReciter(
+        script_file, role, config, refresh_voices=opts["--refresh-voices"]
+    )
+
+
+@logger.catch
+def main(argv=None, shared=None):
+    """
+    The show must go on.
+
+    The daemon runs each command by calling this with its arguments,
+    along with a ScriptReciter to share whatever has already been loaded.
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:] if argv is None else argv)
+    if opts["--trace"]:
+        # before anything is loaded, so that loading the script is traced too
+        telemetry.enable()
 
-    if opts["--list-scenes"]:
+    if opts["daemon"]:
+        # pylint: disable=import-outside-toplevel
+        from read_a_script import daemon
+
+        try:
+            if opts["--stop"]:
+                daemon.stop()
+            else:
+                daemon.start(foreground=opts["--foreground"])
+        except daemon.DaemonError as e:
+            sys.exit(str(e))
+        return
+
+    if opts["convert"]:
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.legacy import convert
+
+        try:
+            paths = convert(
+                opts["LEGACY_DIR"],
+                opts["FOUNTAIN_DIR"],
+                int(opts["--jobs"]) if opts["--jobs"] else None,
+            )
+        except OSError as e:
+            sys.exit(str(e))
+        for path in paths:
+            print(path)
+        return
+
+    if opts["join"]:
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.server import join
+
+        try:
+            if opts["--method"]:
+                learning_method(opts["--method"])
+            join(
+                opts["--role"],
+                {"learning-method": opts["--method"]} if opts["--method"] else None,
+                None if opts["--scenes"] == "all" else mixrange(opts["--scenes"]),
+                cues=opts["--cues"],
+                port=int(opts["--port"]),
+            )
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+        except EOFError:
+            sys.exit("The rehearsal server has gone away")
+        return
+
+    try:
+        learner = learner_for(opts)
+        if opts["unpack"]:
+            learner = ScriptReciter(opts["PACK_FILE"], [], learner.config)
+    except PackError as e:
+        sys.exit(str(e))
+    if shared is not None:
+        learner.share(shared)
+    config = learner.config
+    if DEFAULT_CHARACTER in config["voices"]:
+        # pylint: disable=W0603
+        global DEFAULT_VOICE
+        DEFAULT_VOICE = config["voices"][DEFAULT_CHARACTER]
+
+    if opts["export"]:
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.export import export
+
+        scenes = None if opts["--scenes"] == "all" else mixrange(opts["--scenes"])
+        try:
+            learner.check_voices()
+            learner.check_scenes(scenes)
+        except (UnknownVoiceError, IndexError) as e:
+            sys.exit(str(e))
+        jobs = int(opts["--jobs"]) if opts["--jobs"] else None
+        for path in export(learner, scenes, opts["--output"], jobs):
+            print(path)
+    elif opts["pack"]:
+        try:
+            learner.check_voices()
+            clips = pack(
+                learner,
+                opts["PACK_FILE"],
+                int(opts["--jobs"]) if opts["--jobs"] else None,
+            )
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+        print(
+            f"Packed {learner.script_file} and {clips} lines of speech into {opts['PACK_FILE']}"
+        )
+    elif opts["unpack"]:
+        try:
+            for path in unpack(learner, opts["--output"]):
+                print(path)
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+    elif opts["serve"]:
+        # pylint: disable=import-outside-toplevel
+        from read_a_script.server import RehearsalServer
+
+        try:
+            learner.check_voices()
+            server = RehearsalServer(learner, port=int(opts["--port"]))
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+        # every session shares the parsed script and its index
+        learner.d  # pylint: disable=pointless-statement
+        learner.index  # pylint: disable=pointless-statement
+        print(
+            f"Rehearsing {learner.script_file} on port {server.port}: "
+            "join with `script-learner join -r ROLE`; Ctrl-C to stop"
+        )
+        with server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    elif opts["--list-scenes"]:
         learner.list_scenes()
     elif opts["--list-voices"]:
         learner.list_voices()
     elif opts["--list-roles"]:
         learner.list_roles()
-    elif opts["--scenes"] == "all":
-        learner.learn()
+    elif opts["--stats"]:
+        scenes = None if opts["--scenes"] == "all" else mixrange(opts["--scenes"])
+        try:
+            learner.check_scenes(scenes)
+            learner.stats(scenes).write(sys.stdout, opts["--format"])
+        except (ValueError, IndexError) as e:
+            sys.exit(str(e))
     else:
-        learner.learn(mixrange(opts["--scenes"]))
+        scenes = None if opts["--scenes"] == "all" else mixrange(opts["--scenes"])
+        start = None
+        try:
+            learner.check_voices()
+            if opts["--from"]:
+                start = parse_position(opts["--from"])
+            elif opts["--from-quote"]:
+                start = learner.find_quote(opts["--from-quote"], scenes)
+            elif opts["--resume"]:
+                start = learner.saved_position()
+                if start is None:
+                    print(
+                        "There is nowhere to resume from: starting from the beginning"
+                    )
+            if start is not None:
+                learner.check_position(start, scenes)
+            learner.player  # pylint: disable=pointless-statement
+            if opts["--watch"] and learner.pack is not None:
+                raise ValueError(
+                    f"{learner.script_file} is a rehearsal pack, which can't change: there's nothing to watch"
+                )
+            if not opts["--stream"]:
+                learner.check_scenes(scenes)
+            hint_granularity(config["options"].get("hint-granularity", "word"))
+        except (ValueError, IndexError) as e:
+            sys.exit(str(e))
+        try:
+            learner.learn(
+                scenes,
+                stream=opts["--stream"],
+                cues_only=opts["--cues"] or config["options"].get("cue-only", False),
+                start=start,
+                watch=opts["--watch"],
+            )
+        except PackError as e:
+            sys.exit(str(e))
+        finally:
+            if opts["--trace"]:
+                telemetry.write(opts["--trace"])
+                print(telemetry.summary())
 
 
 if __name__ == "__main__":
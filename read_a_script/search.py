@@ -0,0 +1,175 @@
+"""
+Find where a quotation is in a script, so that learning can start from it.
+
+A WordIndex is an inverted index: for every word in the script, where it's used - which paragraphs,
+and where in them. A quotation is looked up a word at a time, allowing each word of four or more letters a typo
+(a letter missed out, added, changed, or swapped with the next); the paragraphs are ranked by how many
+(and how rare) of its words they have, and by how much of it they have as a phrase, which is found
+by following the words' places through the index, without reading the paragraphs themselves.
+"""
+
+import array
+import bisect
+import math
+import marshal
+import re
+
+# bump this whenever the layout of a saved word index changes
+WORDS_FORMAT = 1
+
+WORD_RE = re.compile(r"\w+(?:'\w+)*")
+# the shortest word which is allowed a typo
+TYPO_LENGTH = 4
+# how much a word with a typo in it counts for, next to the word spelt correctly
+TYPO_WEIGHT = 0.6
+# how much of the quotation must be found for a paragraph to match it at all
+MIN_COVERAGE = 0.5
+# a word's place is the position of its paragraph, shifted up this many bits, plus its position in the paragraph
+PLACE_BITS = 16
+_LETTERS = "abcdefghijklmnopqrstuvwxyz'"
+
+
+def words(text):
+    """The words of some text, as they're indexed: lower-cased, without punctuation"""
+    return WORD_RE.findall(text.casefold())
+
+
+def typos(word):
+    """Every word which `word` is one typo away from"""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    found = set()
+    for left, right in splits:
+        if right:
+            found.add(left + right[1:])
+            for c in _LETTERS:
+                found.add(left + c + right[1:])
+        if len(right) > 1:
+            found.add(left + right[1] + right[0] + right[2:])
+        for c in _LETTERS:
+            found.add(left + c + right)
+    found.discard(word)
+    return found
+
+
+class WordIndex:
+    """
+    Where each word is in a script: `postings` maps each word to where it is, as the bytes of an array of "Q"
+    holding the place of each time it's used: the position of the paragraph, among all the script's paragraphs,
+    followed by (in the lowest PLACE_BITS bits) the position of the word in the paragraph.
+    `count` is how many paragraphs there are.
+    """
+
+    def __init__(self, postings, count):
+        self.postings = postings
+        self.count = count
+
+    @classmethod
+    def build(cls, script):
+        """Index the words of every paragraph of a CompactScript"""
+        strings = script.strings
+        # a paragraph's text is a string ID, so each distinct piece of text is split into words once
+        split = {}
+        postings = {}
+        for position, text in enumerate(script.texts):
+            if text < 0:
+                continue
+            found = split.get(text)
+            if found is None:
+                found = split[text] = words(strings[text])
+            base = position << PLACE_BITS
+            # words past the last place that can be held are all put in it
+            last = (1 << PLACE_BITS) - 1
+            for i, word in enumerate(found):
+                places = postings.get(word)
+                if places is None:
+                    places = postings[word] = array.array("Q")
+                places.append(base + min(i, last))
+        return cls(
+            dict((word, places.tobytes()) for word, places in postings.items()),
+            len(script.texts),
+        )
+
+    def places(self, word):
+        """The places where `word` is used"""
+        places = array.array("Q")
+        places.frombytes(self.postings.get(word, b""))
+        return places
+
+    def _weight(self, word):
+        """How much finding `word` counts for: the rarer it is, the more"""
+        uses = len(self.postings.get(word, b"")) // array.array("Q").itemsize
+        return math.log(1 + self.count / max(uses, 1))
+
+    def spellings(self, word):
+        """Each word in the script which `word` could be a spelling of, with how much finding it counts for"""
+        found = {}
+        if word in self.postings:
+            found[word] = self._weight(word)
+        if len(word) >= TYPO_LENGTH:
+            for typo in typos(word):
+                if typo in self.postings:
+                    found[typo] = TYPO_WEIGHT * self._weight(typo)
+        return found
+
+    def search(self, quotation, within=None):
+        """
+        The positions, among all the script's paragraphs, of the paragraphs which match `quotation`, best first,
+        with how well they match (up to 2): up to 1 for how much of the quotation's words they have
+        (the rarer the word, the more it counts), and up to 1 for how much of the quotation they have as a phrase.
+        Only paragraphs for which `within(position)` is true are considered, if it's given.
+        """
+        query = words(quotation)
+        if not query:
+            return []
+        spellings = [self.spellings(word) for word in query]
+        weights = [max(found.values()) for found in spellings if found]
+        if not weights:
+            return []
+        # a word which isn't in the script at all (misspelt past recognition, perhaps) counts as an average one
+        ideal = sum(weights) + (len(query) - len(weights)) * sum(weights) / len(weights)
+        scores = {}
+        phrases = {}
+        # how many of the quotation's words, up to the one before, are in a row ending at each place
+        runs = {}
+        for found in spellings:
+            best = {}
+            current = {}
+            # the best spelling first, so that it's the one which counts wherever there's a choice
+            for word, weight in sorted(found.items(), key=lambda f: -f[1]):
+                for place in self.places(word):
+                    if place not in current:
+                        current[place] = runs.get(place - 1, 0) + 1
+                        paragraph = place >> PLACE_BITS
+                        best.setdefault(paragraph, weight)
+            for paragraph, weight in best.items():
+                scores[paragraph] = scores.get(paragraph, 0) + weight
+            for place, run in current.items():
+                paragraph = place >> PLACE_BITS
+                if run > phrases.get(paragraph, 0):
+                    phrases[paragraph] = run
+            runs = current
+        ranked = [
+            (score / ideal + phrases[paragraph] / len(query), paragraph)
+            for paragraph, score in scores.items()
+            if score >= MIN_COVERAGE * ideal and (within is None or within(paragraph))
+        ]
+        ranked.sort(key=lambda r: (-r[0], r[1]))
+        return [(paragraph, score) for score, paragraph in ranked]
+
+    def dump(self) -> bytes:
+        """Serialise the index into a compact form"""
+        return marshal.dumps((WORDS_FORMAT, self.count, self.postings))
+
+    @classmethod
+    def load(cls, data: bytes):
+        """Rebuild an index from the output of `dump`"""
+        words_format, count, postings = marshal.loads(data)
+        if words_format != WORDS_FORMAT:
+            raise ValueError(f"unsupported word index format {words_format}")
+        return cls(postings, count)
+
+
+def scene_line(script, position):
+    """The (scene, line) position, as --from takes, of the paragraph at `position` among all of a script's paragraphs"""
+    scene = bisect.bisect_right(script.scene_offsets, position) - 1
+    return scene + 1, position - script.scene_offsets[scene] + 1
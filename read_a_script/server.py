@@ -0,0 +1,254 @@
+"""
+A rehearsal server, so that a cast can rehearse a script at the same time, each learning their own roles.
+
+Every session reads from one parsed script, and plays from one audio cache,
+in which each line is rendered only once however many sessions need it.
+Sessions run on the server: their clients (see `join`) show what they're sent,
+play the clips and pause as they're told to, and send back keypresses.
+Clips are passed by path, so the server only listens on localhost.
+"""
+
+import json
+import socket
+import socketserver
+import sys
+import threading
+
+from read_a_script.player import Player
+from read_a_script.script_learner import (
+    ScriptReciter,
+    hint_granularity,
+    learning_method,
+)
+from read_a_script.session import Bookmarks
+from read_a_script.utils import logger
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# the options which a client can set for its own session
+SESSION_OPTIONS = (
+    "learning-method",
+    "rate",
+    "speak-action",
+    "cue-lines",
+    "cue-last-sentence",
+    "hint-granularity",
+)
+
+
+class Connection:
+    """One JSON message per line, in each direction, over a socket's files"""
+
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        """Send a message"""
+        with self._lock:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def receive(self):
+        """Wait for a message, raising EOFError if the other end has gone away"""
+        line = self.rfile.readline()
+        if not line:
+            raise EOFError
+        return json.loads(line)
+
+    def call(self, message):
+        """Send a message, and wait for the reply"""
+        self.send(message)
+        return self.receive()
+
+
+class SessionOutput:
+    """
+    Stands in for sys.stdout, sending whatever a session's thread prints to its client, a line at a time;
+    anything printed by any other thread goes to `stream` as usual.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def attach(self, connection):
+        """Send what this thread prints over `connection`"""
+        self._local.connection = connection
+        self._local.buffer = []
+
+    def detach(self):
+        """Stop sending what this thread prints anywhere, throwing away anything which hasn't been sent"""
+        self._local.connection = None
+
+    def write(self, text):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            return self.stream.write(text)
+        self._local.buffer.append(text)
+        if "\n" in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.stream.flush()
+        elif self._local.buffer:
+            text = "".join(self._local.buffer)
+            self._local.buffer = []
+            connection.send({"output": text})
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class RemotePlayer(Player):
+    """
+    A Player for a session whose client plays the clips, pauses and reads the keyboard.
+    There's no synthesizing as the line is spoken: every line is played from the shared audio cache.
+    """
+
+    def __init__(self, connection):
+        super().__init__()
+        self.connection = connection
+
+    def play(self, path):
+        self.connection.call({"play": path})
+
+    def pause(self, seconds):
+        self.connection.call({"pause": seconds})
+
+    def key(self):
+        return self.connection.call({"key": True})["key"]
+
+
+class SessionHandler(socketserver.StreamRequestHandler):
+    """Runs one client's session"""
+
+    # messages are small, and each is waited for
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        connection = Connection(self.rfile, self.wfile)
+        output = self.server.output
+        output.attach(connection)
+        try:
+            request = connection.receive()
+            try:
+                session = self.server.session(request, connection)
+            except (ValueError, IndexError) as e:
+                output.flush()
+                connection.send({"error": str(e)})
+                return
+            logger.info(
+                f"Port {self.client_address[1]} is learning {', '.join(session.roles)}"
+            )
+            try:
+                session.learn(
+                    request.get("scenes"), cues_only=bool(request.get("cues", False))
+                )
+            except KeyboardInterrupt:
+                # the client pressed Ctrl-C, to leave the rehearsal rather than to stop the server
+                pass
+            output.flush()
+            connection.send({"done": True})
+        except (EOFError, OSError):
+            # the client has gone away
+            pass
+        finally:
+            output.detach()
+
+
+class RehearsalServer(socketserver.ThreadingTCPServer):
+    """
+    Runs a session for each client which connects on `port`, learning the script of the ScriptReciter `reciter`.
+
+    Each session has a ScriptReciter of its own, for the roles the client asks for,
+    which shares whatever `reciter` has loaded - including the audio cache, which it must have;
+    where a session stops isn't saved.
+    A client can set any of the SESSION_OPTIONS for its session.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, reciter, port=DEFAULT_PORT):
+        if reciter.audio_cache is None:
+            raise ValueError(
+                "The rehearsal server needs the audio cache (options.audio-cache), so that sessions can share it"
+            )
+        self.reciter = reciter
+        self.output = None
+        super().__init__((HOST, port), SessionHandler)
+
+    @property
+    def port(self):
+        """The port the server is listening on"""
+        return self.server_address[1]
+
+    def session(self, request, connection):
+        """
+        The ScriptReciter for a client's `request`, which plays through `connection`,
+        raising ValueError or IndexError if the request can't be met
+        """
+        roles = request.get("roles") or []
+        if not roles:
+            raise ValueError("Say which role(s) you're learning")
+        options = dict(self.reciter.config.get("options") or {})
+        for name, value in (request.get("options") or {}).items():
+            if name not in SESSION_OPTIONS:
+                raise ValueError(f"{name} can't be set for a session")
+            options[name] = value
+        learning_method(options.get("learning-method"))
+        hint_granularity(options.get("hint-granularity", "word"))
+        session = ScriptReciter(
+            self.reciter.script_file, roles, dict(self.reciter.config, options=options)
+        )
+        session.share(self.reciter)
+        session.__dict__["player"] = RemotePlayer(connection)
+        # sessions in the same script would overwrite each other's positions, and can't be resumed anyway
+        session.__dict__["bookmarks"] = Bookmarks()
+        session.check_scenes(request.get("scenes"))
+        return session
+
+    def serve_forever(self, poll_interval=0.5):
+        """Run sessions until shut down, with each session's output going to its client"""
+        stdout = sys.stdout
+        sys.stdout = self.output = SessionOutput(stdout)
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            sys.stdout = stdout
+
+
+def join(roles, options=None, scenes=None, cues=False, port=DEFAULT_PORT):
+    """
+    Join a rehearsal on this machine, learning `roles` in the scenes given (or all of them),
+    with `options` overriding the server's configuration; raise ValueError if the server can't run the session
+    """
+    with socket.create_connection((HOST, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = Connection(sock.makefile("rb"), sock.makefile("wb"))
+        connection.send(
+            {"roles": roles, "options": options or {}, "scenes": scenes, "cues": cues}
+        )
+        player = Player()
+        while True:
+            message = connection.receive()
+            if "output" in message:
+                sys.stdout.write(message["output"])
+                sys.stdout.flush()
+            elif "play" in message:
+                player.play(message["play"])
+                connection.send({"played": True})
+            elif "pause" in message:
+                player.pause(message["pause"])
+                connection.send({"paused": True})
+            elif "key" in message:
+                connection.send({"key": player.key()})
+            elif "error" in message:
+                raise ValueError(message["error"])
+            elif "done" in message:
+                return
@@ -0,0 +1,74 @@
+"""
+Remember where you got to in each script, so that you can pick up where you left off.
+"""
+
+import json
+import os
+
+from read_a_script.utils import logger, write_atomically
+
+POSITIONS_FILE = "positions.json"
+
+
+def parse_position(position):
+    """
+    Turn "SCENE:LINE" (or just "SCENE") into a (scene, line) pair,
+    where both count from 1 and LINE counts the paragraphs of the scene
+    """
+    scene, _, line = position.partition(":")
+    try:
+        return int(scene), int(line or 1)
+    except ValueError:
+        # pylint: disable=raise-missing-from
+        raise ValueError(
+            f"{position!r} is not a position in the script: use SCENE:LINE, for example 3:12"
+        )
+
+
+class Bookmarks:
+    """
+    The position (scene and line, counting from 1) and roles of the last session in each script,
+    keyed by the script's absolute path, and kept in a JSON file at `path`, if one is given.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._positions = {}
+        self._dirty = False
+        if path is not None:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._positions = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable saved positions {path}: {e}")
+
+    def get(self, script_file):
+        """Where the last session in `script_file` stopped, as a dict with scene, line and roles; or None"""
+        return self._positions.get(os.path.abspath(script_file))
+
+    def set(self, script_file, scene, line, roles):
+        """Record where a session in `script_file` stopped"""
+        self._positions[os.path.abspath(script_file)] = {
+            "scene": scene,
+            "line": line,
+            "roles": list(roles),
+        }
+        self._dirty = True
+
+    def clear(self, script_file):
+        """Forget where the last session in `script_file` stopped, as it went all the way through"""
+        if self._positions.pop(os.path.abspath(script_file), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """Write the positions back to disk, if any have changed"""
+        if self.path is None or not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_atomically(self.path, json.dumps(self._positions))
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save position to {self.path}: {e}")
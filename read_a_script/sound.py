@@ -0,0 +1,320 @@
+"""
+Play rendered clips in this process, through one output stream which stays open between them,
+so that there's no process to start for each clip and no gap between one clip and the next.
+
+Clips are memory-mapped rather than read, and are handed to the stream a block at a time
+by a writer thread; the next clip is queued while the end of the one before is still playing.
+"""
+
+import mmap
+import queue
+import struct
+import threading
+import time
+import wave
+
+from read_a_script.audio import CHANNELS, SAMPLE_RATE, SAMPLE_WIDTH
+from read_a_script.player import Player
+
+FRAME_BYTES = SAMPLE_WIDTH * CHANNELS
+BYTES_PER_SECOND = SAMPLE_RATE * FRAME_BYTES
+# how much is handed to the stream at a time
+BLOCK_FRAMES = 1024
+# how much of a clip is still to be handed to the stream when whoever is playing it may queue the next (seconds)
+QUEUE_AHEAD = 0.2
+# how far ahead of what can be heard a sink which keeps time accepts sound, as a sound card's buffer does (seconds)
+SINK_LATENCY = 0.05
+# the WAV format codes for plain integer samples
+_PCM_FORMATS = (0x0001, 0xFFFE)
+_SILENCE = bytes(BLOCK_FRAMES * FRAME_BYTES)
+
+
+class PlaybackError(ValueError):
+    """A clip can't be played, or the stream can't be set up as configured"""
+
+
+class WavClip:
+    """
+    The sound in the WAV file at `path`, memory-mapped: `data` is a memoryview of its samples,
+    which must be in the format clips are rendered in (see read_a_script.audio).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # mmap won't map an empty file
+            raise PlaybackError(f"{path} is not a WAV file") from e
+        self._view = memoryview(self._map)
+        try:
+            self.data = self._samples()
+        except PlaybackError:
+            self._view.release()
+            self._map.close()
+            raise
+
+    def _samples(self):
+        m = self._map
+        if m[0:4] != b"RIFF" or m[8:12] != b"WAVE":
+            raise PlaybackError(f"{self.path} is not a WAV file")
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(m):
+            chunk = m[offset : offset + 4]
+            (size,) = struct.unpack_from("<I", m, offset + 4)
+            start = offset + 8
+            if chunk == b"fmt " and start + 16 <= len(m):
+                fmt = struct.unpack_from("<HHIIHH", m, start)
+            elif chunk == b"data":
+                if fmt is None or fmt[0] not in _PCM_FORMATS:
+                    raise PlaybackError(f"{self.path} is not a PCM WAV file")
+                _, channels, rate, _, _, bits = fmt
+                if (channels, rate, bits) != (CHANNELS, SAMPLE_RATE, 8 * SAMPLE_WIDTH):
+                    raise PlaybackError(
+                        f"{self.path} is {bits}-bit at {rate} Hz in {channels} channel(s), "
+                        f"not {8 * SAMPLE_WIDTH}-bit at {SAMPLE_RATE} Hz in {CHANNELS}"
+                    )
+                # a file which was still being written may claim more than it has
+                end = min(start + size, len(m))
+                end -= (end - start) % FRAME_BYTES
+                return self._view[start:end]
+            offset = start + size + (size & 1)
+        raise PlaybackError(f"{self.path} has no sound in it")
+
+    @property
+    def duration(self):
+        """How long the clip plays for, in seconds"""
+        return len(self.data) / BYTES_PER_SECOND
+
+    def close(self):
+        """Unmap the file"""
+        self.data.release()
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class Sink:
+    """
+    Where a stream's sound goes. If `realtime` is set, write() takes sound no faster than it would be heard,
+    as a sound card would, keeping SINK_LATENCY seconds ahead; `underruns` counts how often it ran dry.
+    """
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.written = 0
+        self.underruns = 0
+        self._due = None
+
+    def open(self):
+        """Get ready for sound"""
+        self._due = None
+
+    def write(self, data):
+        """Take a block of sound, in the format clips are rendered in"""
+        self.written += len(data)
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self._due is None:
+            self._due = now
+        elif self._due < now:
+            # everything written so far has been heard, and there's been silence since
+            self.underruns += 1
+            self._due = now
+        self._due += len(data) / BYTES_PER_SECOND
+        delay = self._due - now - SINK_LATENCY
+        if delay > 0:
+            time.sleep(delay)
+
+    def close(self):
+        """Finish with the sound, waiting until it has all been heard"""
+        if self.realtime and self._due is not None:
+            time.sleep(max(self._due - time.monotonic(), 0))
+
+
+class NullSink(Sink):
+    """Sends the sound nowhere, for testing without a sound card"""
+
+
+class FileSink(Sink):
+    """
+    Writes the sound, just as it would have been heard, to a WAV file at `path`,
+    which is replaced each time the sink is opened
+    """
+
+    def __init__(self, path, realtime=True):
+        super().__init__(realtime)
+        self.path = path
+        self._wav = None
+
+    def open(self):
+        super().open()
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(CHANNELS)
+        self._wav.setsampwidth(SAMPLE_WIDTH)
+        self._wav.setframerate(SAMPLE_RATE)
+
+    def write(self, data):
+        self._wav.writeframes(data)
+        super().write(data)
+
+    def close(self):
+        super().close()
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class DeviceSink(Sink):
+    """Plays the sound on the default output device, through the `sounddevice` package"""
+
+    def __init__(self):
+        super().__init__(realtime=False)
+        try:
+            # pylint: disable=import-outside-toplevel
+            import sounddevice
+        except ImportError as e:
+            raise PlaybackError(
+                "Playing through the sound card needs the sounddevice package: "
+                "pip install sounddevice, or set options.playback to afplay"
+            ) from e
+        self._sounddevice = sounddevice
+        self._stream = None
+
+    def open(self):
+        self._stream = self._sounddevice.RawOutputStream(
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS,
+            dtype=f"int{8 * SAMPLE_WIDTH}",
+            blocksize=BLOCK_FRAMES,
+            latency="low",
+        )
+        self._stream.start()
+
+    def write(self, data):
+        # blocks until the device has room for it
+        if self._stream.write(data):
+            self.underruns += 1
+        self.written += len(data)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+def sink_for(name):
+    """
+    The sink called `name` in the configuration (see options.playback-sink):
+    `device`, `null`, or the path of a WAV file
+    """
+    if name == "device":
+        return DeviceSink()
+    # YAML reads an unquoted null as None
+    if name in ("null", None):
+        return NullSink()
+    if str(name).lower().endswith(".wav"):
+        return FileSink(name)
+    raise PlaybackError(
+        f"{name!r} is not a playback sink: use device, null, or the path of a WAV file"
+    )
+
+
+class _Sound:
+    """Something queued to be played: a clip, or (if `clip` is None) `size` bytes of silence"""
+
+    def __init__(self, clip, size, generation):
+        self.clip = clip
+        self.size = len(clip.data) if clip is not None else size
+        self.generation = generation
+        # set once the next sound may be queued
+        self.queued = threading.Event()
+        self.error = None
+
+
+class StreamPlayer(Player):
+    """
+    A Player which plays clips, and pauses, through one long-lived stream into `sink`.
+
+    play() and pause() return once all but the last QUEUE_AHEAD seconds of their sound has been handed to the sink,
+    so that whatever is played next follows on without a gap. The stream is opened when it's first needed,
+    and closed by close(), once everything queued has been heard.
+    Speech which isn't played from a clip goes through the synthesizers, as usual.
+    """
+
+    def __init__(self, sink, synths=None):
+        super().__init__(synths)
+        self.sink = sink
+        self._queue = queue.Queue()
+        self._thread = None
+        self._generation = 0
+
+    def _start(self):
+        if self._thread is None:
+            self.sink.open()
+            self._thread = threading.Thread(
+                target=self._write, name="audio-stream", daemon=True
+            )
+            self._thread.start()
+
+    def _write(self):
+        ahead = int(QUEUE_AHEAD * BYTES_PER_SECOND)
+        block = BLOCK_FRAMES * FRAME_BYTES
+        while True:
+            sound = self._queue.get()
+            if sound is None:
+                return
+            try:
+                position = 0
+                while position < sound.size and sound.generation == self._generation:
+                    if position >= sound.size - ahead:
+                        sound.queued.set()
+                    end = min(position + block, sound.size)
+                    if sound.clip is None:
+                        self.sink.write(_SILENCE[: end - position])
+                    else:
+                        with sound.clip.data[position:end] as data:
+                            self.sink.write(data)
+                    position = end
+            # pylint: disable=broad-except
+            except Exception as e:
+                sound.error = e
+            finally:
+                if sound.clip is not None:
+                    sound.clip.close()
+                sound.queued.set()
+
+    def _queue_sound(self, clip, size=0):
+        self._start()
+        sound = _Sound(clip, size, self._generation)
+        self._queue.put(sound)
+        sound.queued.wait()
+        if sound.error is not None:
+            raise sound.error
+
+    def play(self, path):
+        self._queue_sound(WavClip(path))
+
+    def pause(self, seconds):
+        self._queue_sound(None, round(seconds * SAMPLE_RATE) * FRAME_BYTES)
+
+    def stop(self):
+        """Cut short whatever is playing or queued, from any thread"""
+        self._generation += 1
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self.sink.close()
@@ -0,0 +1,331 @@
+"""
+Statistics about a script: how many lines and words each role speaks in each scene, and how long they take to say.
+
+They're worked out from the arrays of a CompactScript all at once. Each distinct piece of text is measured once;
+then every paragraph's measurements are summed into tables with a row per scene and a column per role,
+with NumPy if it's installed, or a paragraph at a time over the script's arrays if it isn't.
+The tables don't depend on the rate or the voices a script is read at and in, so they're cached alongside its index.
+"""
+
+import array
+import json
+import marshal
+
+from read_a_script.duration import DEFAULT_RATE, nominal_words
+from read_a_script.utils import ACTION_TYPES, SPOKEN_TYPES, ElementType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# bump this whenever the layout of a saved tally changes
+TALLY_FORMAT = 2
+
+STATS_FORMATS = ("text", "csv", "json")
+CSV_FIELDS = ("scene", "header", "role", "lines", "words", "seconds")
+
+# what's read by whoever reads the action, as well as action itself
+_ACTION_READ_TYPES = ACTION_TYPES | {ElementType.PARENTHETICAL.value}
+
+
+class ScriptStats:
+    """
+    How much each of `roles` speaks in each of the scenes numbered `numbers`, whose headers are `headers`:
+    `lines`, `words` and `seconds` are tables with a row per scene and a column per role.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, numbers, headers, roles, lines, words, seconds):
+        self.numbers = numbers
+        self.headers = headers
+        self.roles = roles
+        self.lines = lines
+        self.words = words
+        self.seconds = seconds
+
+    def select(self, numbers):
+        """The statistics of the scenes with the given (1-based) numbers only, in the order given"""
+        rows = [self.numbers.index(n) for n in numbers]
+        return ScriptStats(
+            [self.numbers[i] for i in rows],
+            [self.headers[i] for i in rows],
+            self.roles,
+            [self.lines[i] for i in rows],
+            [self.words[i] for i in rows],
+            [self.seconds[i] for i in rows],
+        )
+
+    def scene(self, row):
+        """The totals for the scene in `row`: (lines, words, seconds)"""
+        return sum(self.lines[row]), sum(self.words[row]), sum(self.seconds[row])
+
+    def role(self, column):
+        """The totals for the role in `column`, over every scene: (lines, words, seconds)"""
+        return tuple(
+            sum(table[row][column] for row in range(len(self.numbers)))
+            for table in (self.lines, self.words, self.seconds)
+        )
+
+    def cells(self):
+        """(row, column) for each role in each scene, wherever the role has any lines"""
+        for row in range(len(self.numbers)):
+            for column in range(len(self.roles)):
+                if self.lines[row][column]:
+                    yield row, column
+
+    def write(self, f, stats_format="text"):
+        """Write the statistics to a file, as text, CSV or JSON (see STATS_FORMATS)"""
+        if stats_format == "text":
+            self._write_text(f)
+        elif stats_format == "csv":
+            self._write_csv(f)
+        elif stats_format == "json":
+            # encoded all at once, which is much quicker than json.dump's piece at a time
+            f.write(json.dumps(self.as_dict(), indent=2) + "\n")
+        else:
+            raise ValueError(
+                f"{stats_format!r} is not a statistics format: use one of {', '.join(STATS_FORMATS)}"
+            )
+
+    def _write_text(self, f):
+        def line(name, lines, words, seconds, indent="    "):
+            f.write(
+                f"{indent}{name:<{44 - len(indent)}} {lines:>7} {words:>9} {running_time(seconds):>10}\n"
+            )
+
+        def heading(title):
+            f.write(f"{title:<44} {'lines':>7} {'words':>9} {'time':>10}\n")
+
+        for row, number in enumerate(self.numbers):
+            heading(f"Scene {number}: {self.headers[row] or ''}")
+            for column, role in enumerate(self.roles):
+                if self.lines[row][column]:
+                    line(
+                        role,
+                        self.lines[row][column],
+                        self.words[row][column],
+                        self.seconds[row][column],
+                    )
+            line("Total", *self.scene(row), indent="  ")
+            f.write("\n")
+        heading(f"{len(self.numbers)} scene(s)")
+        for column, role in enumerate(self.roles):
+            line(role, *self.role(column))
+        line(
+            "Total",
+            *_totals([self.scene(row) for row in range(len(self.numbers))]),
+            indent="  ",
+        )
+
+    def _write_csv(self, f):
+        # pylint: disable=import-outside-toplevel
+        import csv
+
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for row, column in self.cells():
+            writer.writerow(
+                (
+                    self.numbers[row],
+                    self.headers[row] or "",
+                    self.roles[column],
+                    self.lines[row][column],
+                    self.words[row][column],
+                    round(self.seconds[row][column], 1),
+                )
+            )
+
+    def as_dict(self):
+        """The statistics as plain data: each scene and its roles, each role over every scene, and the totals"""
+
+        def counts(lines, words, seconds):
+            return {"lines": lines, "words": words, "seconds": round(seconds, 1)}
+
+        scenes = []
+        for row, number in enumerate(self.numbers):
+            scene = dict(
+                scene=number, header=self.headers[row], **counts(*self.scene(row))
+            )
+            scene["roles"] = dict(
+                (
+                    role,
+                    counts(
+                        self.lines[row][column],
+                        self.words[row][column],
+                        self.seconds[row][column],
+                    ),
+                )
+                for column, role in enumerate(self.roles)
+                if self.lines[row][column]
+            )
+            scenes.append(scene)
+        return dict(
+            scenes=scenes,
+            roles=dict(
+                (role, counts(*self.role(column)))
+                for column, role in enumerate(self.roles)
+            ),
+            **counts(*_totals([self.scene(row) for row in range(len(self.numbers))])),
+        )
+
+
+def _totals(rows):
+    return tuple(sum(values) for values in zip(*rows)) if rows else (0, 0, 0.0)
+
+
+def running_time(seconds):
+    """A number of seconds as H:MM:SS, or M:SS if it's under an hour"""
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return (
+        f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+    )
+
+
+def _tally_numpy(script, columns, present, width, measures):
+    """Sum each measure of every counted paragraph into the cell for its scene and role, all at once"""
+    types = numpy.frombuffer(script.types, dtype=numpy.int8)
+    characters = numpy.frombuffer(script.characters, dtype=numpy.intc)
+    texts = numpy.frombuffer(script.texts, dtype=numpy.intc)
+    offsets = numpy.frombuffer(script.scene_offsets, dtype=numpy.uintc)
+    scenes = numpy.repeat(
+        numpy.arange(len(offsets) - 1), numpy.diff(offsets.astype(numpy.intp))
+    )
+    columns = numpy.asarray(columns, dtype=numpy.intp)
+    role = numpy.where(numpy.isin(types, list(SPOKEN_TYPES)), columns[characters], -1)
+    role = numpy.where(numpy.isin(types, list(_ACTION_READ_TYPES)), width - 1, role)
+    counted = (role >= 0) & numpy.asarray(present, dtype=bool)[texts]
+    cells = scenes[counted] * width + role[counted]
+    texts = texts[counted]
+    size = (len(offsets) - 1) * width
+    lines = numpy.bincount(cells, minlength=size)
+    sums = [
+        numpy.bincount(cells, weights=numpy.asarray(m)[texts], minlength=size)
+        for m in measures
+    ]
+    return [lines.tolist()] + [s.tolist() for s in sums]
+
+
+def _tally_arrays(script, columns, present, width, measures):
+    """Sum each measure of every counted paragraph into the cell for its scene and role, a paragraph at a time"""
+    offsets = script.scene_offsets
+    types = script.types
+    characters = script.characters
+    texts = script.texts
+    size = (len(offsets) - 1) * width
+    lines = array.array("l", [0]) * size
+    sums = [array.array("d", [0.0]) * size for _ in measures]
+    for scene in range(len(offsets) - 1):
+        base = scene * width
+        for i in range(offsets[scene], offsets[scene + 1]):
+            p_type = types[i]
+            if p_type in SPOKEN_TYPES:
+                column = columns[characters[i]]
+            elif p_type in _ACTION_READ_TYPES:
+                column = width - 1
+            else:
+                continue
+            if column < 0 or not present[texts[i]]:
+                continue
+            cell = base + column
+            lines[cell] += 1
+            for total, measure in zip(sums, measures):
+                total[cell] += measure[texts[i]]
+    return [lines.tolist()] + [s.tolist() for s in sums]
+
+
+class ScriptTally:
+    """
+    What the statistics of a script are worked out from, whatever it's read at and in:
+    the `headers` of its scenes, the `roles` which speak in it, and for each scene and role
+    the `lines`, `words` and `spoken` words (words, counting pauses as words; see duration.nominal_words)
+    spoken - each a flat table with a row per scene, and a column per role followed by one for the action.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, headers, roles, lines, words, spoken):
+        self.headers = headers
+        self.roles = roles
+        self.lines = lines
+        self.words = words
+        self.spoken = spoken
+
+    @classmethod
+    def build(cls, script):
+        """Tally a CompactScript"""
+        strings = script.strings
+        # everything a paragraph refers to is in the string table, so it's measured once, however often it's used;
+        # NONE (-1) finds the last entry, which measures nothing
+        words = [len(s.split()) for s in strings] + [0]
+        spoken = [nominal_words(s) for s in strings] + [0]
+
+        speakers = set()
+        for p_type, character in zip(script.types, script.characters):
+            if p_type in SPOKEN_TYPES and character >= 0:
+                speakers.add(character)
+        roles = sorted(strings[c] for c in speakers)
+        column = dict((role, i) for i, role in enumerate(roles))
+        columns = [column.get(s, -1) for s in strings] + [-1]
+        # paragraphs with nothing in them (such as the title page's) aren't lines
+        present = [bool(s.strip()) for s in strings] + [False]
+
+        tally = _tally_numpy if numpy is not None else _tally_arrays
+        lines, words, spoken = tally(
+            script, columns, present, len(roles) + 1, (words, spoken)
+        )
+        return cls(
+            [scene.header for scene in script.scenes],
+            roles,
+            lines,
+            [int(w) for w in words],
+            spoken,
+        )
+
+    def dump(self) -> bytes:
+        """Serialise the tally into a compact form"""
+        return marshal.dumps(
+            (
+                TALLY_FORMAT,
+                self.headers,
+                self.roles,
+                self.lines,
+                self.words,
+                self.spoken,
+            )
+        )
+
+    @classmethod
+    def load(cls, data: bytes):
+        """Rebuild a tally from the output of `dump`"""
+        tally_format, *fields = marshal.loads(data)
+        if tally_format != TALLY_FORMAT:
+            raise ValueError(f"unsupported tally format {tally_format}")
+        return cls(*fields)
+
+
+def script_stats(tally, voice_for, rate=None, durations=None, action=None):
+    """
+    The ScriptStats of a ScriptTally, read at `rate` words per minute in the voice `voice_for(role)`,
+    with the time each voice takes calibrated by a DurationModel, `durations`, if one is given.
+    If `action` is given, action and parentheticals are counted as the lines of a role of that name, as they're read.
+    """
+    width = len(tally.roles) + 1
+    roles = list(tally.roles)
+    if action is not None:
+        roles.append(action)
+    per_word = [
+        60.0
+        / (rate or DEFAULT_RATE)
+        * (durations.factor(voice_for(role)) if durations is not None else 1.0)
+        for role in roles
+    ]
+    rows = [range(s * width, s * width + len(roles)) for s in range(len(tally.headers))]
+    return ScriptStats(
+        list(range(1, len(rows) + 1)),
+        tally.headers,
+        roles,
+        [[tally.lines[i] for i in row] for row in rows],
+        [[tally.words[i] for i in row] for row in rows],
+        [[tally.spoken[i] * f for i, f in zip(row, per_word)] for row in rows],
+    )
@@ -0,0 +1,126 @@
+"""
+Parse a script in the background, handing over each scene as soon as it has been parsed.
+"""
+
+import queue
+import threading
+
+from jouvence.document import JouvenceDocument
+
+from read_a_script.legacy import is_legacy_file, read_scenes
+from read_a_script.utils import logger
+
+_DONE = object()
+
+
+class _Stop(Exception):
+    """Raised to abandon parsing once every scene that's wanted has been handed over"""
+
+
+class _StreamingDocument(JouvenceDocument):
+    """
+    A JouvenceDocument which only ever holds the scene being parsed:
+    as soon as the parser starts a new scene, the previous one is complete and is passed to `on_scene`.
+    """
+
+    def __init__(self, on_scene):
+        super().__init__()
+        self._on_scene = on_scene
+
+    def addScene(self, header=None):
+        if self.scenes:
+            self._on_scene(self.scenes.pop())
+        return super().addScene(header)
+
+    def finish(self):
+        """The parser has reached the end of the script: hand over the last scene"""
+        if self.scenes:
+            self._on_scene(self.scenes.pop())
+
+
+class SceneStream:
+    """
+    Iterate over the scenes of a script (in Fountain, or in the legacy format) as (number, scene) pairs
+    while it's still being parsed.
+
+    The script is parsed in a background thread, which hands scenes over through a queue of at most `maxsize`;
+    if `wanted` is given, only scenes with those (1-based) numbers are handed over,
+    and parsing stops once the last of them has been.
+    """
+
+    def __init__(self, script_file, wanted=None, maxsize=2):
+        self.script_file = script_file
+        self.wanted = None if wanted is None else set(wanted)
+        self.count = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._parse, name="scene-stream", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise _Stop
+
+    def _on_scene(self, scene):
+        self.count += 1
+        if self.wanted is None or self.count in self.wanted:
+            self._put((self.count, scene))
+        if self.wanted is not None and self.count >= max(self.wanted, default=0):
+            raise _Stop
+
+    def _parse(self):
+        # pylint: disable=import-outside-toplevel
+        # Jouvence doesn't let us choose the document it parses into, so drive its state machine directly
+        from jouvence.parser import _JouvenceStateMachine
+
+        d = _StreamingDocument(self._on_scene)
+        try:
+            legacy = is_legacy_file(self.script_file)
+            with open(self.script_file, encoding="utf-8") as fp:
+                if legacy:
+                    for scene in read_scenes(fp):
+                        self._on_scene(scene)
+                else:
+                    _JouvenceStateMachine(fp, d).run()
+                    d.finish()
+        except _Stop:
+            pass
+        # pylint: disable=broad-except
+        except Exception as e:
+            if isinstance(e.__cause__, _Stop):
+                pass
+            else:
+                logger.debug(f"Parsing {self.script_file} failed: {e}")
+                self._put_final(e)
+                return
+        self._put_final(_DONE)
+
+    def _put_final(self, item):
+        try:
+            self._put(item)
+        except _Stop:
+            pass
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop parsing"""
+        self._stopped.set()
+        self._thread.join()
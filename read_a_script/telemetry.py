@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""Usage:
+  telemetry.py [-h] TRACE_FILE
+
+Options:
+  -h, --help      Document how to use this program
+
+Summarise a trace recorded with `script_learner.py --trace TRACE_FILE`.
+
+Tracing records how long each stage of reading the script takes - parsing, casting, synthesis,
+and the gap before each line starts to play ("cue pickup") - either as a stream of JSON lines
+(if TRACE_FILE ends in .jsonl) or in Chrome's trace event format (load it into chrome://tracing or Perfetto).
+"""
+
+import contextlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+import docopt
+
+CUE_PICKUP = "cue-pickup"
+KEYPRESS_TO_AUDIO = "keypress-to-audio"
+
+
+def percentile(values, p):
+    """The `p`th percentile of `values` (by the nearest-rank method)"""
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class Telemetry:
+    """
+    Records timed events, if it's enabled; when it isn't, recording costs next to nothing.
+
+    Every event has a name, a start time and a duration (both in seconds, relative to when recording started),
+    the thread it happened on, and whatever other arguments were given.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.scene = None
+        self._origin = time.perf_counter()
+        self._cue = None
+        self._keypress = None
+
+    def enable(self):
+        """Start recording"""
+        self.enabled = True
+        self.events = []
+        self._origin = time.perf_counter()
+
+    def record(self, name, start, duration, **args):
+        """Record an event which started at `start` (a perf_counter time) and lasted `duration` seconds"""
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "start": start - self._origin,
+            "duration": duration,
+            "thread": threading.current_thread().name,
+        }
+        event.update(args)
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        """Record how long the body of a `with` block takes"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+
+    def cue(self):
+        """A line has just finished, so the next audio to play is picking up its cue"""
+        if self.enabled:
+            self._cue = time.perf_counter()
+
+    def keypress(self):
+        """The learner has just pressed a key which may lead to audio"""
+        if self.enabled:
+            self._keypress = time.perf_counter()
+
+    def audio_started(self, voice):
+        """
+        Audio in `voice` is about to start playing:
+        record how long it has been since the key that asked for it was pressed, or since the cue.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._keypress is not None:
+            name, start = KEYPRESS_TO_AUDIO, self._keypress
+        elif self._cue is not None:
+            name, start = CUE_PICKUP, self._cue
+        else:
+            return
+        self.record(name, start, now - start, voice=voice, scene=self.scene)
+        self._keypress = self._cue = None
+
+    def write(self, path):
+        """Write the events to `path`: as JSON lines if it ends in .jsonl, otherwise as a Chrome trace"""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for event in self.events:
+                    f.write(json.dumps(event) + "\n")
+            else:
+                json.dump(chrome_trace(self.events), f)
+
+    def summary(self):
+        """A report of the cue pickup latencies, by voice and by scene"""
+        return summarise(self.events)
+
+
+def chrome_trace(events):
+    """Convert events to Chrome's trace event format"""
+    pid = os.getpid()
+    trace = []
+    for event in events:
+        args = dict(
+            (k, v)
+            for k, v in event.items()
+            if k not in ("name", "start", "duration", "thread")
+        )
+        trace.append(
+            {
+                "name": event["name"],
+                "ph": "X",
+                "ts": event["start"] * 1e6,
+                "dur": event["duration"] * 1e6,
+                "pid": pid,
+                "tid": event["thread"],
+                "args": args,
+            }
+        )
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def read_trace(path):
+    """Read events back from a trace file written by Telemetry.write"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        trace = json.load(f)
+    events = []
+    for e in trace["traceEvents"]:
+        event = {
+            "name": e["name"],
+            "start": e["ts"] / 1e6,
+            "duration": e["dur"] / 1e6,
+            "thread": e["tid"],
+        }
+        event.update(e.get("args", {}))
+        events.append(event)
+    return events
+
+
+def summarise(events):
+    """Tabulate p50/p95 latencies (in milliseconds) of cue pickups and keypresses, by voice and by scene"""
+    lines = []
+    for name in (CUE_PICKUP, KEYPRESS_TO_AUDIO):
+        for key in ("voice", "scene"):
+            groups = {}
+            for event in events:
+                if event["name"] == name:
+                    groups.setdefault(event.get(key), []).append(
+                        event["duration"] * 1000
+                    )
+            if not groups:
+                continue
+            lines.append(f"{name} by {key}:")
+            lines.append(f"  {key:<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+            for group, values in sorted(groups.items(), key=lambda kv: str(kv[0])):
+                lines.append(
+                    f"  {str(group):<40} {len(values):>6}"
+                    f" {percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f}"
+                )
+    totals = {}
+    for event in events:
+        if event["name"] not in (CUE_PICKUP, KEYPRESS_TO_AUDIO):
+            count, total = totals.get(event["name"], (0, 0.0))
+            totals[event["name"]] = (count + 1, total + event["duration"])
+    if totals:
+        lines.append("time spent:")
+        for name, (count, total) in sorted(totals.items()):
+            lines.append(f"  {name:<40} {count:>6} {total * 1000:>12.1f} ms")
+    return "\n".join(lines)
+
+
+telemetry = Telemetry()
+
+
+def main():
+    """
+    Summarise a trace file
+    """
+    opts = docopt.docopt(__doc__, sys.argv[1:])
+    print(summarise(read_trace(opts["TRACE_FILE"])))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import contextlib
+import functools
+import os
+import re
+import threading
 from enum import Enum
 
 import jouvence.document
@@ -16,6 +21,28 @@ class ElementType(Enum):
     SYNOPSIS = jouvence.document.TYPE_SYNOPSIS
 
 
+# paragraph type values, grouped by who reads them
+ACTION_TYPES = frozenset(
+    t.value
+    for t in (
+        ElementType.ACTION,
+        ElementType.CENTERED_ACTION,
+        ElementType.TRANSITION,
+        ElementType.SYNOPSIS,
+    )
+)
+SPOKEN_TYPES = frozenset((ElementType.DIALOG.value, ElementType.LYRICS.value))
+
+SENTENCE_END_RE = re.compile(r"(?<=[^.][.!?])\s+")
+# a word which ends a clause, and so ends a hint, however much a hint gives
+CLAUSE_END_RE = re.compile(r"(?:[,;:.!?\u2026\u2014]|--)[\"')\]\u2019\u201d]*$")
+
+# how much of a line each hint gives (see hint_chunks)
+HINT_GRANULARITIES = ("word", "phrase", "punctuation")
+# the most words in a phrase
+PHRASE_WORDS = 3
+
+
 def mixrange(s):
     """
     Expand a range which looks like "1-3,6,8-10" to [1, 2, 3, 6, 8, 9, 10]
@@ -30,6 +57,78 @@ def mixrange(s):
     return r
 
 
+def last_sentence(text):
+    """
+    The last sentence of some text, or all of it if it's only one sentence
+    """
+    sentences = [s for s in SENTENCE_END_RE.split(text.strip()) if s]
+    return sentences[-1] if sentences else text
+
+
+def trimmed_cue(text):
+    """
+    A cue line cut down to its last sentence, as it's read with cue-last-sentence
+    """
+    last = last_sentence(text)
+    return text if last == text.strip() else "... " + last
+
+
+def hint_chunks(text, granularity="word"):
+    """
+    Split a line into the hints which are given, one after another, while learning it:
+    a word at a time, a phrase at a time, or everything up to the next punctuation at a time.
+    Phrases never run on past punctuation, and each clause is shared out evenly between as few phrases
+    of up to PHRASE_WORDS words as will hold it, so that no word is left on its own if it needn't be.
+    """
+    clauses = []
+    clause = []
+    for word in text.split():
+        clause.append(word)
+        if CLAUSE_END_RE.search(word):
+            clauses.append(clause)
+            clause = []
+    if clause:
+        clauses.append(clause)
+    if granularity == "punctuation":
+        return tuple(" ".join(clause) for clause in clauses)
+    most = PHRASE_WORDS if granularity == "phrase" else 1
+    chunks = []
+    for clause in clauses:
+        count = -(-len(clause) // most)
+        for i in range(count):
+            chunks.append(
+                " ".join(
+                    clause[i * len(clause) // count : (i + 1) * len(clause) // count]
+                )
+            )
+    return tuple(chunks)
+
+
+@contextlib.contextmanager
+def replacing(path, suffix=""):
+    """
+    Write a file without it ever being seen half-written: yield the name of a temporary file beside `path`
+    to write instead, which replaces `path` once the block has finished, or is removed if it fails.
+    `suffix` ends the temporary file's name, for writers which go by it.
+    """
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp{suffix}"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+
+
+def write_atomically(path, data):
+    """Replace the contents of `path` with `data` (bytes, or text to be written as UTF-8), all at once"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with replacing(path) as tmp:
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+
 def merge(dict_1, dict_2):
     """Merge two dictionaries.
 
@@ -41,3 +140,35 @@ def merge(dict_1, dict_2):
         (str(key), dict_1.get(key) or dict_2.get(key))
         for key in set(dict_2) | set(dict_1)
     )
+
+
+class _LazyLogger:
+    """
+    Stands in for loguru's logger, which is slow to import:
+    loguru is only imported once something is actually logged.
+    """
+
+    def __getattr__(self, name):
+        # pylint: disable=import-outside-toplevel
+        from loguru import logger as _logger
+
+        return getattr(_logger, name)
+
+    def catch(self, func):
+        """Like loguru's `logger.catch` decorator, but without importing loguru up front"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            # pylint: disable=broad-except
+            except Exception:
+                self.exception(
+                    f"An error has been caught in function '{func.__qualname__}'"
+                )
+                return None
+
+        return wrapper
+
+
+logger = _LazyLogger()
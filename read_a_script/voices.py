@@ -0,0 +1,137 @@
+"""
+The voices installed on this machine.
+
+Asking the OS for its voices means a round-trip through `say`,
+so the list is cached on disk and only refreshed when it is older than its TTL (or on request).
+"""
+
+import functools
+import json
+import os
+import subprocess
+import threading
+import time
+
+from read_a_script.utils import logger, write_atomically
+
+CATALOG_FILE = "voices.json"
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class UnknownVoiceError(ValueError):
+    """One or more voices in the configuration are not installed"""
+
+    def __init__(self, unknown):
+        self.unknown = unknown
+        super().__init__(
+            "These voices are not installed: "
+            + ", ".join(f"{voice} (for {role})" for role, voice in unknown.items())
+        )
+
+
+def list_installed_voices():
+    """Ask the OS which voices are installed, returning the lines `say -v ?` prints"""
+    output = subprocess.check_output(["say", "-v", "?"]).decode("utf-8")
+    return [line for line in output.split("\n") if line]
+
+
+class VoiceCatalog:
+    """
+    The installed voices, cached in `directory` for up to `ttl` seconds.
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, refresh=False):
+        self.path = os.path.join(directory, CATALOG_FILE)
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def _load(self):
+        if self.refresh:
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                catalog = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable voice catalog {self.path}: {e}")
+            return None
+        if time.time() - catalog.get("fetched", 0) > self.ttl:
+            return None
+        return catalog["voices"]
+
+    def _store(self, lines):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_atomically(
+                self.path, json.dumps({"fetched": time.time(), "voices": lines})
+            )
+        except OSError as e:
+            logger.warning(f"Could not write voice catalog {self.path}: {e}")
+
+    @functools.cached_property
+    def lines(self):
+        """What `say -v ?` prints about the installed voices, one line per voice"""
+        lines = self._load()
+        if lines is None:
+            lines = list_installed_voices()
+            self._store(lines)
+        return lines
+
+    @functools.cached_property
+    def voices(self):
+        """The installed voices, keyed by capitalised name"""
+        # pylint: disable=import-outside-toplevel
+        from macos_speech import Voice
+
+        return dict((v.name.capitalize(), v) for v in map(Voice, self.lines))
+
+    def check(self, voices):
+        """
+        Check every role's voice against the catalog in one pass,
+        raising UnknownVoiceError listing all the voices that aren't installed.
+        """
+        unknown = dict(
+            (role, voice)
+            for role, voice in voices.items()
+            if str(voice).capitalize() not in self.voices
+        )
+        if unknown:
+            raise UnknownVoiceError(unknown)
+
+
+def _macos_synthesizer(voice, rate):
+    # pylint: disable=import-outside-toplevel
+    from macos_speech import Synthesizer
+
+    synth = Synthesizer(voice=voice)
+    synth.rate = rate
+    return synth
+
+
+class SynthesizerPool:
+    """
+    Synthesizers shared between everyone who speaks with the same voice at the same rate.
+
+    Setting up a Synthesizer means several round-trips through `say`, so there's only ever one per (voice, rate),
+    made by `factory(voice, rate)` when it's first needed.
+    """
+
+    def __init__(self, factory=_macos_synthesizer):
+        self.factory = factory
+        self._synths = {}
+        self._lock = threading.Lock()
+
+    def get(self, voice, rate=None):
+        """The synthesizer for `voice` at `rate`"""
+        with self._lock:
+            key = (voice, rate)
+            if key not in self._synths:
+                self._synths[key] = self.factory(voice, rate)
+            return self._synths[key]
+
+    def __len__(self):
+        return len(self._synths)
+
+
+synthesizers = SynthesizerPool()
@@ -0,0 +1,155 @@
+"""
+Keep a parsed script up to date while its file is being edited, re-parsing only the scenes which have changed.
+"""
+
+import hashlib
+import os
+import re
+
+from jouvence.parser import RE_EMPTY_LINE, RE_SCENE_HEADER_PATTERN, JouvenceParser
+
+from read_a_script.cache import parse_text, store_script
+from read_a_script.legacy import is_legacy
+from read_a_script.telemetry import telemetry
+from read_a_script.utils import logger
+
+# lines which might be scene headers; Jouvence's own pattern decides whether they are
+_CANDIDATE_RE = re.compile(r"^(?:int|ext|est|i/e)", re.I | re.M)
+
+
+def split_scenes(text):
+    """
+    Split the text of a Fountain script into chunks which Jouvence can parse separately:
+    whatever comes before the first scene header (such as the title page), then one chunk per scene,
+    each starting with the blank line before its header, which Jouvence takes as part of the header.
+    """
+    starts = []
+    for m in _CANDIDATE_RE.finditer(text):
+        start = m.start()
+        end = text.find("\n", start)
+        if end < 0:
+            continue
+        after = text.find("\n", end + 1)
+        following = text[end + 1 : after if after >= 0 else len(text)]
+        before = text.rfind("\n", 0, max(start - 1, 0)) + 1
+        preceding = text[before : max(start - 1, 0)]
+        if (
+            RE_SCENE_HEADER_PATTERN.match(text[start:end])
+            and RE_EMPTY_LINE.match(following.rstrip("\r"))
+            and RE_EMPTY_LINE.match(preceding.rstrip("\r"))
+        ):
+            starts.append(before if start else start)
+    bounds = [0] + starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def _header(chunk):
+    lines = chunk.split("\n", 2)
+    header = lines[1] if len(lines) > 1 and RE_EMPTY_LINE.match(lines[0]) else lines[0]
+    return header.rstrip("\r").lstrip(".")
+
+
+def _hash(chunk):
+    return hashlib.sha256(chunk.encode("utf-8")).digest()
+
+
+class LiveScript:
+    """
+    A CompactScript, `script`, which follows the file it was parsed from.
+
+    The script's text is split into chunks, one per scene, which are hashed;
+    when the file changes, only the chunks whose hashes have changed are parsed again,
+    and the unchanged scenes are copied across from the previous version of the script.
+    If `directory` is given, each new version is put into the parse cache there.
+    """
+
+    def __init__(self, script_file, script, directory=None):
+        self.script_file = script_file
+        self.script = script
+        self.directory = directory
+        self._signature = self._stat()
+        with open(script_file, encoding="utf-8") as f:
+            chunks = split_scenes(f.read())
+        # the hash of each chunk, and the numbers of the scenes it became
+        self._chunks = self._match(chunks, script)
+
+    def _stat(self):
+        st = os.stat(self.script_file)
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _match(chunks, script):
+        """Pair each chunk with the scenes it was parsed into, if they line up"""
+        preamble = 1 if script.scenes and script.scenes[0].header is None else 0
+        if len(chunks) - 1 != len(script.scenes) - preamble or any(
+            _header(chunk) != scene.header
+            for chunk, scene in zip(chunks[1:], script.scenes[preamble:])
+        ):
+            logger.debug("Could not match the script's scenes to its text")
+            return []
+        numbers = [range(preamble)] + [
+            range(i, i + 1) for i in range(preamble, len(script.scenes))
+        ]
+        return list(zip(map(_hash, chunks), numbers))
+
+    def reload(self):
+        """
+        Re-read the script if its file has changed.
+        Return None if nothing has; otherwise, for each scene of the new version,
+        the number (counting from 0) of the scene of the old version which it is a copy of,
+        or None if it is new or has changed.
+        """
+        try:
+            signature = self._stat()
+            if signature == self._signature:
+                return None
+            with open(self.script_file, "rb") as f:
+                data = f.read()
+            text = data.decode("utf-8")
+        except (OSError, ValueError) as e:
+            # it may be part way through being saved: try again next time
+            logger.debug(f"Could not re-read {self.script_file}: {e}")
+            return None
+        self._signature = signature
+        if is_legacy(text):
+            # legacy scripts aren't split into scenes, but they're quick to read
+            return self._replace(text, data)
+
+        with telemetry.span("reparse"):
+            known = {}
+            for h, numbers in self._chunks:
+                known.setdefault(h, numbers)
+            scenes = []
+            title_values = None
+            chunks = []
+            for i, chunk in enumerate(split_scenes(text)):
+                h = _hash(chunk)
+                first = len(scenes)
+                if h in known:
+                    scenes.extend(known[h])
+                else:
+                    d = JouvenceParser().parseString(chunk)
+                    if i > 0 and [s.header for s in d.scenes] != [_header(chunk)]:
+                        # the chunk didn't parse into exactly the scene expected
+                        return self._replace(text, data)
+                    if i == 0:
+                        title_values = d.title_values
+                    scenes.extend(d.scenes)
+                chunks.append((h, range(first, len(scenes))))
+            origins = [s if isinstance(s, int) else None for s in scenes]
+            self.script = self.script.replace_scenes(scenes, title_values)
+            self._chunks = chunks
+        if self.directory is not None:
+            store_script(self.script_file, data, self.script, self.directory)
+        if origins == list(range(len(origins))):
+            return None
+        return origins
+
+    def _replace(self, text, data):
+        """Parse the whole script again"""
+        logger.debug(f"Parsing the whole of {self.script_file} again")
+        self.script = parse_text(text)
+        self._chunks = self._match(split_scenes(text), self.script)
+        if self.directory is not None:
+            store_script(self.script_file, data, self.script, self.directory)
+        return [None] * len(self.script.scenes)